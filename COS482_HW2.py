@@ -3,11 +3,91 @@ from psycopg2 import errors
 import getpass
 import os
 import csv
+import sys
+import time
+import uuid
+from compressed_input import find_input, open_input
+from parallel_parse import iter_cast_rows, use_parallel_parse
+from name_search import create_search_indexes
+from movie_ranks import create_movie_ranks
+from movie_facets import create_movie_facets
+from batch_tuning import make_controllers
+from blue_green import (SHADOW_SCHEMA, prepare_shadow, analyze_schema,
+                        validate_shadow, swap_schemas)
+from telemetry import InstrumentedCursor
 
-def create_tables_and_load_data():
+# Year ranges of the Movie partitions used by the partitioned schema.
+# Movies with no year go to the default partition.
+MOVIE_YEAR_PARTITIONS = [('movie_pre1900', 'MINVALUE', 1900)] + [
+    (f"movie_{decade}s", decade, decade + 10) for decade in range(1900, 2010, 10)
+] + [('movie_2010_on', 2010, 'MAXVALUE')]
+
+# Number of hash partitions of ActsIn and Directs (both on mid, so the two
+# can be joined partition by partition)
+MID_HASH_PARTITIONS = 8
+
+
+def create_partitions(cur):
+    """
+    Create the partitions of the Movie, ActsIn and Directs tables for the
+    partitioned schema.
+    """
+    for name, low, high in MOVIE_YEAR_PARTITIONS:
+        cur.execute(f"CREATE TABLE {name} PARTITION OF Movie FOR VALUES FROM ({low}) TO ({high})")
+    cur.execute("CREATE TABLE movie_no_year PARTITION OF Movie DEFAULT")
+    
+    for table in ('ActsIn', 'Directs'):
+        for remainder in range(MID_HASH_PARTITIONS):
+            cur.execute(
+                f"CREATE TABLE {table.lower()}_p{remainder} PARTITION OF {table} "
+                f"FOR VALUES WITH (MODULUS {MID_HASH_PARTITIONS}, REMAINDER {remainder})"
+            )
+
+
+def cluster_partitions(cur, table, column):
+    """
+    Physically reorder every partition of table by its index on column.
+    """
+    cur.execute("""
+        SELECT c.relname, i.relname
+        FROM pg_inherits h
+        JOIN pg_class c ON c.oid = h.inhrelid
+        JOIN pg_index x ON x.indrelid = c.oid
+        JOIN pg_class i ON i.oid = x.indexrelid
+        JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum = x.indkey[0]
+        WHERE h.inhparent = %s::regclass
+          AND x.indnatts = 1
+          AND a.attname = %s
+    """, (table.lower(), column))
+    for partition, index in cur.fetchall():
+        cur.execute(f"CLUSTER {partition} USING {index}")
+
+
+def create_tables_and_load_data(partitioned=False, parse_workers=None, blue_green=False,
+                                fixed_batch_size=None):
     """
     Create five tables (Movie, Person, ActsIn, Director, Directs) 
     in the moviesdb database and load data from IMDB text files.
+    Each file may also be gzip, zstd or bz2 compressed (IMDBCast.txt.gz,
+    ...); it is then decompressed on a separate thread while parsing.
+    A large plain IMDBCast.txt is split into byte ranges and parsed by
+    parse_workers processes (default: one per CPU).
+    
+    With partitioned=True, Movie is range-partitioned by year (with a
+    (year, rank) index on every partition) and ActsIn/Directs are
+    hash-partitioned on mid and clustered on mid after loading. Year-range
+    queries then only scan the matching partitions, and ActsIn/Directs
+    joins on mid can be done partition by partition.
+    
+    With blue_green=True, the live tables are left alone while loading:
+    the new version is built, indexed and analyzed in a shadow schema,
+    its row counts are validated and its tables then replace those in
+    public in one transaction. The replaced tables are kept for rollback
+    (blue_green.py).
+    
+    Insert batch sizes are tuned per table while loading to maximize
+    rows/sec (batch_tuning.py); fixed_batch_size turns this off and uses
+    that size for every table.
     """
     
     # Prompt user for database password (hidden input)
@@ -27,30 +107,53 @@ def create_tables_and_load_data():
             host="localhost",
             dbname="moviesdb",
             user="postgres",
-            password=db_password
+            password=db_password,
+            cursor_factory=InstrumentedCursor
         )
         cur = conn.cursor()
         print("Successfully connected to moviesdb database\n")
         
-        # Drop existing tables if they exist (to allow re-running)
-        print("Dropping existing tables if they exist...")
-        cur.execute("DROP TABLE IF EXISTS ActsIn CASCADE")
-        cur.execute("DROP TABLE IF EXISTS Directs CASCADE")
-        cur.execute("DROP TABLE IF EXISTS Movie CASCADE")
-        cur.execute("DROP TABLE IF EXISTS Person CASCADE")
-        cur.execute("DROP TABLE IF EXISTS Director CASCADE")
-        conn.commit()
+        if blue_green:
+            # Build the new version next to the live tables
+            print(f"Building into shadow schema {SHADOW_SCHEMA}...")
+            prepare_shadow(conn)
+        else:
+            # Drop existing tables if they exist (to allow re-running)
+            print("Dropping existing tables if they exist...")
+            cur.execute("DROP TABLE IF EXISTS ActsIn CASCADE")
+            cur.execute("DROP TABLE IF EXISTS Directs CASCADE")
+            cur.execute("DROP TABLE IF EXISTS Movie CASCADE")
+            cur.execute("DROP TABLE IF EXISTS Person CASCADE")
+            cur.execute("DROP TABLE IF EXISTS Director CASCADE")
+            cur.execute("DROP TABLE IF EXISTS LoadInfo CASCADE")
+            cur.execute("DROP TABLE IF EXISTS MovieRank")
+            cur.execute("DROP TABLE IF EXISTS MovieFacets")
+            conn.commit()
         
         # Create Movie table
         print("Creating Movie table...")
-        cur.execute("""
-            CREATE TABLE Movie(
-                id INTEGER PRIMARY KEY,
-                name TEXT,
-                year INTEGER,
-                rank REAL
-            )
-        """)
+        if partitioned:
+            # A partitioned table's unique keys must include the partition
+            # key, so id uniqueness is enforced while loading instead
+            cur.execute("""
+                CREATE TABLE Movie(
+                    id INTEGER NOT NULL,
+                    name TEXT,
+                    year INTEGER,
+                    rank REAL,
+                    UNIQUE (id, year)
+                ) PARTITION BY RANGE (year)
+            """)
+            cur.execute("CREATE INDEX idx_movie_year_rank ON Movie(year, rank)")
+        else:
+            cur.execute("""
+                CREATE TABLE Movie(
+                    id INTEGER PRIMARY KEY,
+                    name TEXT,
+                    year INTEGER,
+                    rank REAL
+                )
+            """)
         conn.commit()
         print("Movie table created successfully")
         
@@ -81,46 +184,70 @@ def create_tables_and_load_data():
         
         # Create ActsIn table (with foreign key constraints)
         print("Creating ActsIn table...")
-        cur.execute("""
+        cur.execute(f"""
             CREATE TABLE ActsIn(
                 pid INTEGER,
                 mid INTEGER,
                 role TEXT,
                 PRIMARY KEY (pid, mid)
-            )
+            ){' PARTITION BY HASH (mid)' if partitioned else ''}
         """)
         conn.commit()
         print("ActsIn table created successfully")
         
         # Create Directs table (with foreign key constraints)
         print("Creating Directs table...")
-        cur.execute("""
+        cur.execute(f"""
             CREATE TABLE Directs(
                 did INTEGER,
                 mid INTEGER,
                 PRIMARY KEY (did, mid)
+            ){' PARTITION BY HASH (mid)' if partitioned else ''}
+        """)
+        conn.commit()
+        print("Directs table created successfully")
+        
+        if partitioned:
+            print("Creating partitions of Movie, ActsIn and Directs...")
+            create_partitions(cur)
+            # Let the planner join and aggregate partition by partition
+            cur.execute(f"ALTER DATABASE {conn.info.dbname} SET enable_partitionwise_join = on")
+            cur.execute(f"ALTER DATABASE {conn.info.dbname} SET enable_partitionwise_aggregate = on")
+            conn.commit()
+            print("Partitions created successfully")
+        
+        # Create LoadInfo table (identifies this load, e.g. for snapshots)
+        print("Creating LoadInfo table...")
+        cur.execute("""
+            CREATE TABLE LoadInfo(
+                run_id TEXT PRIMARY KEY,
+                loaded_at TIMESTAMPTZ
             )
         """)
         conn.commit()
-        print("Directs table created successfully\n")
+        print("LoadInfo table created successfully\n")
         
         # Load data from IMDB files
         print("=" * 60)
         print("Loading data from IMDB files...")
         print("=" * 60)
         
+        # Batch sizes adapt to the measured commit throughput (batch_tuning.py)
+        batches = make_controllers(fixed_batch_size)
+        
         # Load Movie data from IMDBMovie.txt
-        movie_file = os.path.join(data_dir, "IMDBMovie.txt")
+        movie_file = find_input(data_dir, "IMDBMovie.txt")
         print(f"\nLoading Movie data from {movie_file}...")
         movie_count = 0
         movie_skipped = 0
         
         try:
-            with open(movie_file, 'r', encoding='latin-1') as f:
+            with open_input(movie_file) as f:
                 reader = csv.reader(f)
                 next(reader)  # Skip header
                 
                 batch = []
+                seen_ids = set()  # Movie ids seen so far (partitioned schema only)
                 for row in reader:
                     if len(row) >= 4:
                         try:
@@ -128,16 +255,26 @@ def create_tables_and_load_data():
                             name = row[1]
                             year = int(row[2]) if row[2] else None
                             rank = float(row[3]) if row[3] else None
+                            
+                            # The partitioned Movie table cannot reject duplicate ids itself
+                            if partitioned:
+                                if movie_id in seen_ids:
+                                    movie_skipped += 1
+                                    continue
+                                seen_ids.add(movie_id)
+                            
                             batch.append((movie_id, name, year, rank))
                             
-                            # Batch insert every 1000 rows
-                            if len(batch) >= 1000:
+                            # Batch insert once the batch reaches the tuned size
+                            if len(batch) >= batches['Movie'].size:
                                 try:
+                                    batch_start = time.perf_counter()
                                     cur.executemany(
                                         "INSERT INTO Movie (id, name, year, rank) VALUES (%s, %s, %s, %s)",
                                         batch
                                     )
                                     conn.commit()
+                                    batches['Movie'].record(len(batch), time.perf_counter() - batch_start)
                                     movie_count += len(batch)
                                     batch = []
                                 except psycopg2.Error:
@@ -183,19 +320,20 @@ def create_tables_and_load_data():
                                 movie_skipped += 1
                 
             print(f"✓ Loaded {movie_count} movies ({movie_skipped} skipped due to errors)")
+            batches['Movie'].report()
             if movie_skipped > 0:
                 print(f"  (Note: Skipped movies are likely duplicates with same ID)")
         except FileNotFoundError:
             print(f"✗ File not found: {movie_file}")
         
         # Load Person data from IMDBPerson.txt
-        person_file = os.path.join(data_dir, "IMDBPerson.txt")
+        person_file = find_input(data_dir, "IMDBPerson.txt")
         print(f"\nLoading Person data from {person_file}...")
         person_count = 0
         person_skipped = 0
         
         try:
-            with open(person_file, 'r', encoding='latin-1') as f:
+            with open_input(person_file) as f:
                 reader = csv.reader(f)
                 next(reader)  # Skip header
                 
@@ -209,13 +347,15 @@ def create_tables_and_load_data():
                             gender = row[3]
                             batch.append((person_id, fname, lname, gender))
                             
-                            if len(batch) >= 1000:
+                            if len(batch) >= batches['Person'].size:
                                 try:
+                                    batch_start = time.perf_counter()
                                     cur.executemany(
                                         "INSERT INTO Person (id, fname, lname, gender) VALUES (%s, %s, %s, %s)",
                                         batch
                                     )
                                     conn.commit()
+                                    batches['Person'].record(len(batch), time.perf_counter() - batch_start)
                                     person_count += len(batch)
                                     batch = []
                                 except psycopg2.Error:
@@ -259,17 +399,18 @@ def create_tables_and_load_data():
                                 person_skipped += 1
                 
             print(f"✓ Loaded {person_count} persons ({person_skipped} skipped due to errors)")
+            batches['Person'].report()
         except FileNotFoundError:
             print(f"✗ File not found: {person_file}")
         
         # Load Director data from IMDBDirectors.txt
-        director_file = os.path.join(data_dir, "IMDBDirectors.txt")
+        director_file = find_input(data_dir, "IMDBDirectors.txt")
         print(f"\nLoading Director data from {director_file}...")
         director_count = 0
         director_skipped = 0
         
         try:
-            with open(director_file, 'r', encoding='latin-1') as f:
+            with open_input(director_file) as f:
                 reader = csv.reader(f)
                 next(reader)  # Skip header
                 
@@ -282,13 +423,15 @@ def create_tables_and_load_data():
                             lname = row[2]
                             batch.append((director_id, fname, lname))
                             
-                            if len(batch) >= 1000:
+                            if len(batch) >= batches['Director'].size:
                                 try:
+                                    batch_start = time.perf_counter()
                                     cur.executemany(
                                         "INSERT INTO Director (id, fname, lname) VALUES (%s, %s, %s)",
                                         batch
                                     )
                                     conn.commit()
+                                    batches['Director'].record(len(batch), time.perf_counter() - batch_start)
                                     director_count += len(batch)
                                     batch = []
                                 except psycopg2.Error:
@@ -332,23 +475,30 @@ def create_tables_and_load_data():
                                 director_skipped += 1
                 
             print(f"✓ Loaded {director_count} directors ({director_skipped} skipped due to errors)")
+            batches['Director'].report()
         except FileNotFoundError:
             print(f"✗ File not found: {director_file}")
         
         # Load ActsIn data from IMDBCast.txt
-        actsin_file = os.path.join(data_dir, "IMDBCast.txt")
+        actsin_file = find_input(data_dir, "IMDBCast.txt")
         print(f"\nLoading ActsIn data from {actsin_file}...")
         print("(Loading without foreign key constraints for speed...)")
         actsin_count = 0
         actsin_skipped = 0
+        workers = parse_workers or os.cpu_count()
         
         try:
-            with open(actsin_file, 'r', encoding='latin-1') as f:
-                reader = csv.reader(f)
-                next(reader)  # Skip header
+            with open_input(actsin_file) as f:
+                parse_counts = {}
+                if use_parallel_parse(actsin_file, workers):
+                    # Rows come back already converted, in file order
+                    print(f"(Parsing with {workers} worker processes...)")
+                    reader = iter_cast_rows(actsin_file, workers, parse_counts)
+                else:
+                    reader = csv.reader(f)
+                    next(reader)  # Skip header
                 
                 batch = []
-                batch_size = 5000  # Larger batch size for speed
                 seen_pairs = set()  # Track (pid, mid) pairs to avoid duplicates
                 
                 for row in reader:
@@ -366,13 +516,15 @@ def create_tables_and_load_data():
                             seen_pairs.add((pid, mid))
                             batch.append((pid, mid, role))
                             
-                            if len(batch) >= batch_size:
+                            if len(batch) >= batches['ActsIn'].size:
                                 try:
+                                    batch_start = time.perf_counter()
                                     cur.executemany(
                                         "INSERT INTO ActsIn (pid, mid, role) VALUES (%s, %s, %s)",
                                         batch
                                     )
                                     conn.commit()
+                                    batches['ActsIn'].record(len(batch), time.perf_counter() - batch_start)
                                     actsin_count += len(batch)
                                     print(f"  Progress: {actsin_count} records loaded...", end='\r')
                                     batch = []
@@ -417,7 +569,11 @@ def create_tables_and_load_data():
                                 conn.rollback()
                                 actsin_skipped += 1
                 
+            # Rows the parallel parser could not convert
+            actsin_skipped += parse_counts.get('invalid', 0)
+            
             print(f"\n✓ Loaded {actsin_count} acting records ({actsin_skipped} skipped)")
+            batches['ActsIn'].report()
             
             # Now delete rows that violate foreign key constraints
             print("  Removing records with invalid person or movie IDs...")
@@ -443,18 +599,17 @@ def create_tables_and_load_data():
             print(f"✗ File not found: {actsin_file}")
         
         # Load Directs data from IMDBMovie_Directors.txt
-        directs_file = os.path.join(data_dir, "IMDBMovie_Directors.txt")
+        directs_file = find_input(data_dir, "IMDBMovie_Directors.txt")
         print(f"\nLoading Directs data from {directs_file}...")
         directs_count = 0
         directs_skipped = 0
         
         try:
-            with open(directs_file, 'r', encoding='latin-1') as f:
+            with open_input(directs_file) as f:
                 reader = csv.reader(f)
                 next(reader)  # Skip header
                 
                 batch = []
-                batch_size = 5000
                 seen_pairs = set()  # Track (did, mid) pairs to avoid duplicates
                 
                 for row in reader:
@@ -471,13 +626,15 @@ def create_tables_and_load_data():
                             seen_pairs.add((did, mid))
                             batch.append((did, mid))
                             
-                            if len(batch) >= batch_size:
+                            if len(batch) >= batches['Directs'].size:
                                 try:
+                                    batch_start = time.perf_counter()
                                     cur.executemany(
                                         "INSERT INTO Directs (did, mid) VALUES (%s, %s)",
                                         batch
                                     )
                                     conn.commit()
+                                    batches['Directs'].record(len(batch), time.perf_counter() - batch_start)
                                     directs_count += len(batch)
                                     print(f"  Progress: {directs_count} records loaded...", end='\r')
                                     batch = []
@@ -523,6 +680,7 @@ def create_tables_and_load_data():
                                 directs_skipped += 1
                 
             print(f"\n✓ Loaded {directs_count} directing records ({directs_skipped} skipped)")
+            batches['Directs'].report()
             
             # Remove records with invalid foreign keys
             print("  Removing records with invalid director or movie IDs...")
@@ -544,9 +702,48 @@ def create_tables_and_load_data():
             print(f"  Removed {deleted} records with invalid foreign keys")
             directs_count -= deleted
             
+            if partitioned:
+                # Store each movie's cast and directors next to each other
+                print("  Clustering ActsIn and Directs partitions on mid...")
+                cluster_partitions(cur, 'ActsIn', 'mid')
+                cluster_partitions(cur, 'Directs', 'mid')
+                conn.commit()
+            
         except FileNotFoundError:
             print(f"✗ File not found: {directs_file}")
         
+        # Build the trigram and prefix indexes used by name_search.py
+        # (pg_trgm may be unavailable or need privileges the load user lacks;
+        # the rest of the load does not depend on these indexes)
+        print("\nCreating name search indexes...")
+        try:
+            create_search_indexes(cur)
+            conn.commit()
+            print("✓ Name search indexes created")
+        except psycopg2.Error as e:
+            conn.rollback()
+            print(f"✗ Name search indexes skipped: {e}")
+        
+        # Precompute each movie's rank position within its year (movie_ranks.py)
+        print("\nComputing within-year rank positions...")
+        create_movie_ranks(cur)
+        conn.commit()
+        print("✓ MovieRank table created")
+        
+        # Precompute per-movie facets for faceted top-k queries (task4.py)
+        print("\nComputing movie facets (directors, cast gender counts)...")
+        create_movie_facets(cur)
+        conn.commit()
+        print("✓ MovieFacets table created")
+        
+        # Record this load run so derived data (snapshots) can be matched to it
+        run_id = uuid.uuid4().hex
+        cur.execute(
+            "INSERT INTO LoadInfo (run_id, loaded_at) VALUES (%s, now())",
+            (run_id,)
+        )
+        conn.commit()
+        
         # Summary
         print("\n" + "=" * 60)
         print("SUMMARY")
@@ -556,8 +753,33 @@ def create_tables_and_load_data():
         print(f"Directors loaded:     {director_count}")
         print(f"ActsIn records:       {actsin_count}")
         print(f"Directs records:      {directs_count}")
+        print(f"Load run ID:          {run_id}")
         print("=" * 60)
         
+        if blue_green:
+            print(f"\nAnalyzing {SHADOW_SCHEMA}...")
+            analyze_schema(cur, SHADOW_SCHEMA)
+            conn.commit()
+            
+            problems = validate_shadow(cur, {
+                'Movie': movie_count,
+                'Person': person_count,
+                'Director': director_count,
+                'ActsIn': actsin_count,
+                'Directs': directs_count,
+            })
+            conn.commit()
+            if problems:
+                print("✗ Validation failed, live tables left unchanged:")
+                for problem in problems:
+                    print(f"  - {problem}")
+                print(f"  (the new version is kept in {SHADOW_SCHEMA} for inspection)")
+            else:
+                attempts = swap_schemas(conn)
+                print(f"✓ Swapped the new version in after {attempts} attempt(s) "
+                      f"(previous version kept for rollback)")
+            cur.execute("RESET search_path")
+        
         # Verify tables
         print("\nVerifying tables in moviesdb:")
         cur.execute("""
@@ -585,4 +807,10 @@ def create_tables_and_load_data():
         print("\nDatabase connection closed")
 
 if __name__ == "__main__":
-    create_tables_and_load_data()
\ No newline at end of file
+    fixed_batch_size = None
+    for arg in sys.argv[1:]:
+        if arg.startswith('--batch-size='):
+            fixed_batch_size = int(arg.split('=', 1)[1])
+    create_tables_and_load_data(partitioned='--partitioned' in sys.argv,
+                                blue_green='--blue-green' in sys.argv,
+                                fixed_batch_size=fixed_batch_size)
\ No newline at end of file
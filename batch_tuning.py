@@ -0,0 +1,265 @@
+import csv
+import getpass
+import os
+import statistics
+import time
+
+import psycopg2
+
+from compressed_input import find_input, open_input
+from telemetry import InstrumentedCursor
+
+# Batch sizes the loader starts from (its former fixed sizes)
+DEFAULT_BATCH_SIZES = {
+    'Movie': 1000,
+    'Person': 1000,
+    'Director': 1000,
+    'ActsIn': 5000,
+    'Directs': 5000,
+}
+
+# Bounds of the adaptive batch size. Larger batches also make the
+# row-by-row fallback after a failed batch more expensive.
+MIN_BATCH_SIZE = 100
+MAX_BATCH_SIZE = 50000
+
+# Batches measured at each size before deciding the next move; the median
+# throughput of these is compared with the previous size's
+SAMPLES_PER_SIZE = 3
+
+# Factor the size is multiplied or divided by. It starts at INITIAL_STEP
+# and is reduced (down to MIN_STEP) every time the search reverses.
+INITIAL_STEP = 2.0
+MIN_STEP = 1.1
+
+# A batch whose insert + commit takes longer than this shrinks the batch
+# size right away, however good its throughput
+MAX_BATCH_SECONDS = 2.0
+
+
+class BatchSizeController:
+    """
+    Chooses the loader's batch size for one table by hill climbing on the
+    measured rows/sec of its commits: the size keeps moving in the same
+    direction while throughput improves, and reverses with a smaller step
+    when it gets worse.
+
+    Call record(rows, seconds) after every committed full batch and use
+    .size for the next one. With adaptive=False the size stays fixed and
+    only the throughput is measured.
+    """
+
+    def __init__(self, table, initial, min_size=MIN_BATCH_SIZE, max_size=MAX_BATCH_SIZE,
+                 adaptive=True):
+        self.table = table
+        self.size = initial
+        self.min_size = min_size
+        self.max_size = max_size
+        self.adaptive = adaptive
+        self.direction = 1
+        self.step = INITIAL_STEP
+        self.samples = []
+        self.previous_rate = None
+        self.rows = 0
+        self.seconds = 0.0
+        # (rows loaded so far, new size, rows/sec that led to the change)
+        self.history = [(0, initial, None)]
+
+    def record(self, rows, seconds):
+        self.rows += rows
+        self.seconds += seconds
+        if not self.adaptive:
+            return
+        rate = rows / max(seconds, 1e-9)
+
+        if seconds > MAX_BATCH_SECONDS and self.size > self.min_size:
+            self.direction = -1
+            self.resize(self.size / self.step, rate)
+            return
+
+        self.samples.append(rate)
+        if len(self.samples) < SAMPLES_PER_SIZE:
+            return
+        rate = statistics.median(self.samples)
+        if self.previous_rate is not None and rate < self.previous_rate:
+            self.direction = -self.direction
+            self.step = max(MIN_STEP, self.step ** 0.5)
+        self.previous_rate = rate
+
+        new_size = self.size * self.step if self.direction > 0 else self.size / self.step
+        if not self.min_size <= new_size <= self.max_size:
+            # Hit a bound: search back the other way
+            self.direction = -self.direction
+        self.resize(new_size, rate)
+
+    def resize(self, new_size, rate):
+        new_size = int(min(self.max_size, max(self.min_size, new_size)))
+        self.samples = []
+        if new_size != self.size:
+            self.size = new_size
+            self.history.append((self.rows, new_size, rate))
+
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def report(self):
+        """Print the batch sizes chosen over the load and the throughput."""
+        mode = "adaptive" if self.adaptive else "fixed"
+        print(f"  Batch size ({mode}): {self.size}, "
+              f"{self.rows_per_second():.0f} rows/s over full batches")
+        if len(self.history) > 1:
+            print("  Batch size changes (after rows loaded: size @ measured rows/s):")
+            for rows, size, rate in self.history[1:]:
+                print(f"    {rows:>10}: {size:>6} @ {rate:.0f}")
+
+
+def make_controllers(fixed_batch_size=None):
+    """
+    One BatchSizeController per loaded table. With fixed_batch_size, every
+    table uses that size unchanged (for comparison with the adaptive sizes).
+    """
+    if fixed_batch_size:
+        return {table: BatchSizeController(table, fixed_batch_size, adaptive=False)
+                for table in DEFAULT_BATCH_SIZES}
+    return {table: BatchSizeController(table, size)
+            for table, size in DEFAULT_BATCH_SIZES.items()}
+
+
+# Scratch schema holding the benchmark's tables; dropped when it finishes
+BENCHMARK_SCHEMA = 'moviesdb_batch_bench'
+
+# Tables loaded by the benchmark: the widest (Movie) and the largest
+# (ActsIn) input, into regular tables shaped like the real ones (not
+# temporary tables: those skip the WAL, and with it most of the per-commit
+# cost the controller tunes against)
+BENCHMARK_TABLES = [
+    {'file': 'IMDBMovie.txt', 'table': 'Movie',
+     'create': f"CREATE TABLE {BENCHMARK_SCHEMA}.bench_movie (id INTEGER PRIMARY KEY, name TEXT, year INTEGER, rank REAL)",
+     'insert': f"INSERT INTO {BENCHMARK_SCHEMA}.bench_movie VALUES (%s, %s, %s, %s) ON CONFLICT DO NOTHING",
+     'parse': lambda row: (int(row[0]), row[1], int(row[2]) if row[2] else None,
+                           float(row[3]) if row[3] else None)},
+    {'file': 'IMDBCast.txt', 'table': 'ActsIn',
+     'create': f"CREATE TABLE {BENCHMARK_SCHEMA}.bench_actsin (pid INTEGER, mid INTEGER, role TEXT, PRIMARY KEY (pid, mid))",
+     'insert': f"INSERT INTO {BENCHMARK_SCHEMA}.bench_actsin VALUES (%s, %s, %s) ON CONFLICT DO NOTHING",
+     'parse': lambda row: (int(row[0]), int(row[1]), row[2] if len(row) > 2 else '')},
+]
+
+
+def read_rows(data_dir, spec, limit):
+    """Up to limit parsed rows of a benchmark input."""
+    rows = []
+    with open_input(find_input(data_dir, spec['file'])) as f:
+        reader = csv.reader(f)
+        next(reader)  # Skip header
+        for row in reader:
+            try:
+                rows.append(spec['parse'](row))
+            except (ValueError, IndexError):
+                continue
+            if len(rows) >= limit:
+                break
+    return rows
+
+
+def timed_load(conn, spec, rows, controller):
+    """
+    Insert rows into a fresh benchmark table in batches of controller.size,
+    committing each batch. Returns the total seconds.
+    """
+    cur = conn.cursor()
+    cur.execute(f"DROP TABLE IF EXISTS {BENCHMARK_SCHEMA}.bench_{spec['table'].lower()}")
+    cur.execute(spec['create'])
+    conn.commit()
+
+    start = time.perf_counter()
+    pos = 0
+    while pos < len(rows):
+        batch = rows[pos:pos + controller.size]
+        batch_start = time.perf_counter()
+        cur.executemany(spec['insert'], batch)
+        conn.commit()
+        if len(batch) == controller.size:
+            controller.record(len(batch), time.perf_counter() - batch_start)
+        pos += len(batch)
+    elapsed = time.perf_counter() - start
+    cur.close()
+    return elapsed
+
+
+def benchmark(conn, data_dir, limit=500000, fixed_sizes=(500, 1000, 5000, 20000)):
+    """
+    Load the same rows with each fixed batch size and with the adaptive
+    controller, and print the rows/sec of each. The tables are created in
+    BENCHMARK_SCHEMA, which is dropped afterwards.
+    """
+    cur = conn.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {BENCHMARK_SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {BENCHMARK_SCHEMA}")
+    conn.commit()
+    try:
+        run_benchmark(conn, data_dir, limit, fixed_sizes)
+    finally:
+        conn.rollback()
+        cur.execute(f"DROP SCHEMA IF EXISTS {BENCHMARK_SCHEMA} CASCADE")
+        conn.commit()
+        cur.close()
+
+
+def run_benchmark(conn, data_dir, limit, fixed_sizes):
+    """Time every batch size on every benchmark table and print the results."""
+    print(f"{'Table':<10} {'Batch size':<22} {'Rows':<10} {'Seconds':<10} {'Rows/s':<10}")
+    print("-" * 62)
+    for spec in BENCHMARK_TABLES:
+        if not os.path.exists(find_input(data_dir, spec['file'])):
+            print(f"{spec['table']:<10} (missing {spec['file']})")
+            continue
+        rows = read_rows(data_dir, spec, limit)
+
+        runs = [(str(size), BatchSizeController(spec['table'], size, adaptive=False))
+                for size in fixed_sizes]
+        adaptive = BatchSizeController(spec['table'], DEFAULT_BATCH_SIZES[spec['table']])
+        runs.append(("adaptive", adaptive))
+        for label, controller in runs:
+            elapsed = timed_load(conn, spec, rows, controller)
+            if label == "adaptive":
+                label = f"adaptive (ended {controller.size})"
+            print(f"{spec['table']:<10} {label:<22} {len(rows):<10} {elapsed:<10.2f} "
+                  f"{len(rows) / elapsed:<10.0f}")
+        adaptive.report()
+
+
+def main():
+    """
+    Compare fixed batch sizes against the adaptive controller on an IMDB
+    (or synthetic) data directory.
+    """
+    print("PostgreSQL Database Connection")
+    db_password = getpass.getpass("Enter PostgreSQL password for user 'postgres': ")
+    data_dir = input("Enter the path to the directory containing IMDB .txt files: ").strip()
+    if not os.path.isdir(data_dir):
+        print(f"Error: Directory '{data_dir}' does not exist")
+        return
+
+    conn = None
+    try:
+        conn = psycopg2.connect(
+            host="localhost",
+            dbname="moviesdb",
+            user="postgres",
+            password=db_password,
+            cursor_factory=InstrumentedCursor
+        )
+        print("Successfully connected to moviesdb database\n")
+        benchmark(conn, data_dir)
+
+    except psycopg2.Error as e:
+        print(f"\nDatabase error: {e}")
+
+    finally:
+        if conn:
+            conn.close()
+        print("\nDatabase connection closed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import getpass
+import time
+
+import psycopg2
+from psycopg2 import errors
+
+from telemetry import InstrumentedCursor
+
+# The loader builds the next version of the tables in SHADOW_SCHEMA while
+# readers keep using public. The swap moves the loader's tables (and their
+# partitions, indexes and sequences) from public to PREVIOUS_SCHEMA, kept
+# for rollback, and from the shadow schema to public. Nothing else in
+# public is touched, and public itself is never renamed or dropped.
+SHADOW_SCHEMA = 'moviesdb_shadow'
+PREVIOUS_SCHEMA = 'moviesdb_previous'
+
+# Used while rolling back, to exchange the tables of public and
+# PREVIOUS_SCHEMA; empty and dropped again in the same transaction
+ROLLBACK_SCHEMA = 'moviesdb_swap'
+
+# Tables that must be loaded before a swap
+LOADED_TABLES = ['Movie', 'Person', 'Director', 'ActsIn', 'Directs']
+
+# Every table the loader builds; these are the tables a swap moves
+SWAPPED_TABLES = LOADED_TABLES + ['LoadInfo', 'MovieRank', 'MovieFacets']
+
+# A swap is refused if a table would shrink below this fraction of the
+# live row count (e.g. a truncated input file)
+MIN_ROW_RATIO = 0.5
+
+# ALTER TABLE ... SET SCHEMA takes an ACCESS EXCLUSIVE lock on every moved
+# table, and new readers of a table queue behind the swap while it waits
+# for that lock (e.g. behind a long-running query). Each attempt therefore
+# waits at most SWAP_LOCK_TIMEOUT, then backs off so the queued readers
+# can run, and tries again up to SWAP_ATTEMPTS times.
+SWAP_LOCK_TIMEOUT = '100ms'
+SWAP_ATTEMPTS = 50
+SWAP_RETRY_DELAY = 0.5
+
+
+def prepare_shadow(conn):
+    """
+    Create an empty shadow schema and point this session at it, so the
+    loader's unqualified CREATE TABLE / INSERT statements build the next
+    version there.
+    """
+    cur = conn.cursor()
+
+    # Leftovers of an earlier reload that never swapped
+    cur.execute(f"DROP SCHEMA IF EXISTS {SHADOW_SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {SHADOW_SCHEMA}")
+    cur.execute(f"GRANT USAGE ON SCHEMA {SHADOW_SCHEMA} TO PUBLIC")
+    # public stays off the path, so a statement can never reach a live table
+    cur.execute(f"SET search_path TO {SHADOW_SCHEMA}")
+    conn.commit()
+    cur.close()
+
+
+def analyze_schema(cur, schema):
+    """ANALYZE every table of schema."""
+    cur.execute("SELECT tablename FROM pg_catalog.pg_tables WHERE schemaname = %s", (schema,))
+    for (table,) in cur.fetchall():
+        cur.execute(f"ANALYZE {schema}.{table}")
+
+
+def count_rows(cur, schema, table):
+    """Row count of schema.table, or None if it does not exist."""
+    cur.execute("SELECT to_regclass(%s)", (f"{schema}.{table.lower()}",))
+    if cur.fetchone()[0] is None:
+        return None
+    cur.execute(f"SELECT COUNT(*) FROM {schema}.{table}")
+    return cur.fetchone()[0]
+
+
+def estimate_rows(cur, schema, table):
+    """Planner row estimate of schema.table (0 if unknown or missing)."""
+    cur.execute("""
+        SELECT c.reltuples FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = %s AND c.relname = %s
+    """, (schema, table.lower()))
+    row = cur.fetchone()
+    return max(row[0], 0) if row else 0
+
+
+def validate_shadow(cur, expected_counts):
+    """
+    Check the shadow tables before a swap: each must hold the number of
+    rows the loader counted, be non-empty, and not be much smaller than
+    the live table (by its planner estimate, to avoid scanning it).
+    Returns a list of problems (empty if it may be swapped).
+    """
+    problems = []
+    for table in LOADED_TABLES:
+        shadow = count_rows(cur, SHADOW_SCHEMA, table)
+        live = estimate_rows(cur, 'public', table)
+        if shadow is None:
+            problems.append(f"{table}: missing from {SHADOW_SCHEMA}")
+            continue
+        if shadow == 0:
+            problems.append(f"{table}: no rows loaded")
+        if table in expected_counts and shadow != expected_counts[table]:
+            problems.append(f"{table}: {shadow} rows, loader counted {expected_counts[table]}")
+        if live and shadow < live * MIN_ROW_RATIO:
+            problems.append(f"{table}: {shadow} rows, live version has about {live:.0f}")
+    return problems
+
+
+def table_family(cur, schema, table):
+    """
+    Names of schema.table and of all its partitions (recursively) that are
+    in the same schema, parent first. Empty if the table does not exist.
+    """
+    cur.execute("""
+        WITH RECURSIVE family(oid, depth) AS (
+            SELECT to_regclass(%s)::oid, 0
+            UNION ALL
+            SELECT i.inhrelid, f.depth + 1
+            FROM pg_inherits i JOIN family f ON i.inhparent = f.oid
+        )
+        SELECT c.relname
+        FROM family f
+        JOIN pg_class c ON c.oid = f.oid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = %s
+        ORDER BY f.depth, c.relname
+    """, (f"{schema}.{table.lower()}", schema))
+    return [row[0] for row in cur.fetchall()]
+
+
+def move_tables(cur, source, target):
+    """
+    Move the SWAPPED_TABLES that exist in source, with their partitions, to
+    target. Indexes, constraints and owned sequences move with them.
+    """
+    for table in SWAPPED_TABLES:
+        for name in table_family(cur, source, table):
+            cur.execute(f"ALTER TABLE {source}.{name} SET SCHEMA {target}")
+
+
+def drop_tables(cur, schema):
+    """
+    Drop the SWAPPED_TABLES that exist in schema. They are dropped in one
+    statement without CASCADE, so anything else that depends on them (e.g.
+    a view) makes this fail instead of being dropped along with them.
+    """
+    names = [f"{schema}.{table}" for table in SWAPPED_TABLES
+             if table_family(cur, schema, table)]
+    if names:
+        cur.execute(f"DROP TABLE {', '.join(names)}")
+
+
+def run_with_lock_retries(conn, statements):
+    """
+    Run statements(cur) in one transaction with a short lock_timeout,
+    retrying the whole transaction while a lock is not available.
+    Returns the number of attempts it took.
+    """
+    for attempt in range(1, SWAP_ATTEMPTS + 1):
+        cur = conn.cursor()
+        try:
+            cur.execute(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'")
+            statements(cur)
+            conn.commit()
+            return attempt
+        except errors.LockNotAvailable:
+            conn.rollback()
+            if attempt == SWAP_ATTEMPTS:
+                raise
+        except (psycopg2.Error, RuntimeError):
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+        time.sleep(SWAP_RETRY_DELAY)
+
+
+def swap_schemas(conn):
+    """
+    Make the shadow tables live in one transaction: the previous rollback
+    copy is dropped, the tables in public move to PREVIOUS_SCHEMA and the
+    shadow tables move to public. The swap needs each live table to itself
+    for a moment, so it is retried (see SWAP_LOCK_TIMEOUT) until no
+    reader holds one; statements after it see the new version.
+    Returns the number of attempts it took.
+    """
+    def statements(cur):
+        cur.execute(f"CREATE SCHEMA IF NOT EXISTS {PREVIOUS_SCHEMA}")
+        drop_tables(cur, PREVIOUS_SCHEMA)
+        move_tables(cur, 'public', PREVIOUS_SCHEMA)
+        move_tables(cur, SHADOW_SCHEMA, 'public')
+
+    return run_with_lock_retries(conn, statements)
+
+
+def rollback_swap(conn):
+    """
+    Exchange the tables of public and PREVIOUS_SCHEMA, in one transaction.
+    Running it twice rolls forward again.
+    """
+    def statements(cur):
+        if not any(table_family(cur, PREVIOUS_SCHEMA, table) for table in LOADED_TABLES):
+            raise RuntimeError(f"No previous version ({PREVIOUS_SCHEMA}) to roll back to")
+        cur.execute(f"CREATE SCHEMA {ROLLBACK_SCHEMA}")
+        move_tables(cur, 'public', ROLLBACK_SCHEMA)
+        move_tables(cur, PREVIOUS_SCHEMA, 'public')
+        move_tables(cur, ROLLBACK_SCHEMA, PREVIOUS_SCHEMA)
+        cur.execute(f"DROP SCHEMA {ROLLBACK_SCHEMA}")
+
+    return run_with_lock_retries(conn, statements)
+
+
+def main():
+    """
+    Roll back to the previous version of the tables.
+    """
+    print("PostgreSQL Database Connection")
+    db_password = getpass.getpass("Enter PostgreSQL password for user 'postgres': ")
+
+    conn = None
+    try:
+        conn = psycopg2.connect(
+            host="localhost",
+            dbname="moviesdb",
+            user="postgres",
+            password=db_password,
+            cursor_factory=InstrumentedCursor
+        )
+        print("Successfully connected to moviesdb database\n")
+
+        cur = conn.cursor()
+        cur.execute("SELECT run_id, loaded_at FROM public.LoadInfo")
+        current = cur.fetchone()
+        cur.close()
+
+        rollback_swap(conn)
+        print(f"✓ Rolled back: the load from {current[1] if current else 'unknown'} "
+              f"is now in {PREVIOUS_SCHEMA}")
+
+        cur = conn.cursor()
+        cur.execute("SELECT run_id, loaded_at FROM public.LoadInfo")
+        restored = cur.fetchone()
+        cur.close()
+        if restored:
+            print(f"✓ Live version: load run {restored[0]} from {restored[1]}")
+
+    except (psycopg2.Error, RuntimeError) as e:
+        print(f"\n✗ Rollback failed: {e}")
+
+    finally:
+        if conn:
+            conn.close()
+        print("\nDatabase connection closed")
+
+
+if __name__ == "__main__":
+    main()
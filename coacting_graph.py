@@ -0,0 +1,395 @@
+import json
+import os
+import shutil
+import time
+
+from numpy_engine import lookup
+from snapshot import load_snapshot, np
+
+# Bump when the cached array layout changes
+GRAPH_FORMAT_VERSION = 1
+
+# Arrays that make up a graph; each is cached as <name>.npy
+GRAPH_ARRAYS = [
+    'entity_ids', 'entity_kinds', 'movie_ids',
+    'entity_indptr', 'entity_movies', 'movie_indptr', 'movie_entities',
+]
+
+# Values of entity_kinds
+PERSON = 0
+DIRECTOR = 1
+KIND_CODES = {'person': PERSON, 'director': DIRECTOR}
+
+
+def expand(nodes, indptr, indices):
+    """
+    Gather the CSR neighbor lists of nodes in one vectorized step.
+    Returns (neighbors, parents) with one entry per edge.
+    """
+    starts = indptr[nodes]
+    lengths = indptr[nodes + 1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    within = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    neighbors = indices[np.repeat(starts, lengths) + within]
+    parents = np.repeat(nodes, lengths)
+    return neighbors, parents
+
+
+def build_csr(rows, cols, n_rows):
+    """
+    CSR adjacency (indptr, indices) for the edge list rows -> cols.
+    """
+    order = np.argsort(rows, kind='stable')
+    counts = np.bincount(rows, minlength=n_rows)
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    return indptr, cols[order].astype(np.int32)
+
+
+class CoactingGraph:
+    """
+    Bipartite graph of entities (persons, optionally directors) and movies,
+    stored as two CSR adjacency structures:
+        entity -> movies   (entity_indptr, entity_movies)
+        movie -> entities  (movie_indptr, movie_entities)
+    Nodes are addressed by row index; entity_ids/movie_ids map them back
+    to database ids.
+    """
+
+    def __init__(self, arrays, meta):
+        for name in GRAPH_ARRAYS:
+            setattr(self, name, arrays[name])
+        self.meta = meta
+        self.n_entities = len(self.entity_ids)
+        self.n_movies = len(self.movie_ids)
+
+        # entity_ids is sorted within each kind, so lookups are per-kind searches
+        self.kind_bounds = {}
+        for kind, code in KIND_CODES.items():
+            positions = np.flatnonzero(self.entity_kinds == code)
+            if len(positions):
+                self.kind_bounds[kind] = (int(positions[0]), int(positions[-1]) + 1)
+
+    @classmethod
+    def from_snapshot(cls, snapshot_dir, include_directors=False):
+        """
+        Build the graph from the ActsIn (and optionally Directs) columns
+        of a snapshot written by snapshot.py.
+        """
+        manifest, t = load_snapshot(snapshot_dir)
+        movie_ids = np.asarray(t['Movie']['id'])
+        person_ids = np.asarray(t['Person']['id'])
+
+        edge_entity, edge_movie = [], []
+        entity_ids, entity_kinds = [person_ids], [np.full(len(person_ids), PERSON, dtype=np.int8)]
+        sources = [('ActsIn', 'pid', person_ids, 0)]
+        if include_directors:
+            director_ids = np.asarray(t['Director']['id'])
+            entity_ids.append(director_ids)
+            entity_kinds.append(np.full(len(director_ids), DIRECTOR, dtype=np.int8))
+            sources.append(('Directs', 'did', director_ids, len(person_ids)))
+
+        for table, id_column, ids, offset in sources:
+            eidx, e_found = lookup(ids, t[table][id_column])
+            midx, m_found = lookup(movie_ids, t[table]['mid'])
+            keep = e_found & m_found
+            edge_entity.append(eidx[keep] + offset)
+            edge_movie.append(midx[keep])
+
+        edge_entity = np.concatenate(edge_entity)
+        edge_movie = np.concatenate(edge_movie)
+        n_entities = sum(len(ids) for ids in entity_ids)
+
+        entity_indptr, entity_movies = build_csr(edge_entity, edge_movie, n_entities)
+        movie_indptr, movie_entities = build_csr(edge_movie, edge_entity, len(movie_ids))
+
+        arrays = {
+            'entity_ids': np.concatenate(entity_ids),
+            'entity_kinds': np.concatenate(entity_kinds),
+            'movie_ids': movie_ids.copy(),
+            'entity_indptr': entity_indptr,
+            'entity_movies': entity_movies,
+            'movie_indptr': movie_indptr,
+            'movie_entities': movie_entities,
+        }
+        meta = {
+            'format_version': GRAPH_FORMAT_VERSION,
+            'load_run_id': manifest['load_run_id'],
+            'snapshot_created_at': manifest.get('created_at'),
+            'include_directors': include_directors,
+            'edges': int(len(edge_entity)),
+        }
+        return cls(arrays, meta)
+
+    def save(self, cache_dir):
+        """
+        Write the graph arrays as .npy files plus meta.json to cache_dir.
+        """
+        tmp_dir = cache_dir.rstrip(os.sep) + '.tmp'
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
+        os.makedirs(tmp_dir)
+        for name in GRAPH_ARRAYS:
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, indent=2)
+        if os.path.exists(cache_dir):
+            shutil.rmtree(cache_dir)
+        os.rename(tmp_dir, cache_dir)
+
+    @classmethod
+    def load(cls, cache_dir):
+        """
+        Memory-map a graph saved with save().
+        """
+        with open(os.path.join(cache_dir, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(cache_dir, f"{name}.npy"), mmap_mode='r')
+            for name in GRAPH_ARRAYS
+        }
+        return cls(arrays, meta)
+
+    def entity_index(self, entity_id, kind='person'):
+        """
+        Row index of a person or director id, or None if it is not in the graph.
+        """
+        if kind not in self.kind_bounds:
+            return None
+        lo, hi = self.kind_bounds[kind]
+        ids = self.entity_ids[lo:hi]
+        i = int(np.searchsorted(ids, entity_id))
+        if i < len(ids) and ids[i] == entity_id:
+            return lo + i
+        return None
+
+    def entity_ref(self, index):
+        """(kind, id) of an entity row index."""
+        kind = 'person' if self.entity_kinds[index] == PERSON else 'director'
+        return kind, int(self.entity_ids[index])
+
+    def shortest_path(self, source_id, target_id, source_kind='person', target_kind='person'):
+        """
+        Shortest co-acting path between two entities using bidirectional BFS.
+
+        Returns the path as a list alternating entity (kind, id) tuples and
+        movie ids, starting at the source and ending at the target, or None
+        if they are not connected (or either id is unknown).
+        """
+        source = self.entity_index(source_id, source_kind)
+        target = self.entity_index(target_id, target_kind)
+        if source is None or target is None:
+            return None
+        if source == target:
+            return [self.entity_ref(source)]
+
+        # Per side: distance (in half-hops) to every entity and movie, the
+        # parent each node was reached from, and the current frontier
+        sides = []
+        for root in (source, target):
+            side = {
+                'entity_dist': np.full(self.n_entities, -1, dtype=np.int32),
+                'movie_dist': np.full(self.n_movies, -1, dtype=np.int32),
+                'entity_parent': np.full(self.n_entities, -1, dtype=np.int64),
+                'movie_parent': np.full(self.n_movies, -1, dtype=np.int64),
+                'frontier': np.array([root], dtype=np.int64),
+                'frontier_is_entity': True,
+                'depth': 0,
+            }
+            side['entity_dist'][root] = 0
+            sides.append(side)
+
+        while len(sides[0]['frontier']) and len(sides[1]['frontier']):
+            # Expand the side with the smaller frontier by one half-hop
+            this = 0 if len(sides[0]['frontier']) <= len(sides[1]['frontier']) else 1
+            side, other = sides[this], sides[1 - this]
+
+            if side['frontier_is_entity']:
+                found, parents = expand(side['frontier'], self.entity_indptr, self.entity_movies)
+                dist, parent, other_dist = side['movie_dist'], side['movie_parent'], other['movie_dist']
+            else:
+                found, parents = expand(side['frontier'], self.movie_indptr, self.movie_entities)
+                dist, parent, other_dist = side['entity_dist'], side['entity_parent'], other['entity_dist']
+
+            new = dist[found] < 0
+            found, parents = found[new], parents[new]
+            found, first = np.unique(found, return_index=True)
+            side['depth'] += 1
+            dist[found] = side['depth']
+            parent[found] = parents[first]
+            side['frontier'] = found.astype(np.int64)
+            side['frontier_is_entity'] = not side['frontier_is_entity']
+
+            # Meeting nodes: reached from this side and already seen by the other
+            meet = found[other_dist[found] >= 0]
+            if len(meet):
+                best = meet[np.argmin(other_dist[meet])]
+                is_entity = side['frontier_is_entity']
+                half_a = self._trace(side, best, is_entity)
+                half_b = self._trace(other, best, is_entity)
+                path = half_a[::-1] + half_b[1:]
+                return path if this == 0 else path[::-1]
+
+        return None
+
+    def _trace(self, side, node, is_entity):
+        """
+        Follow parent pointers from node back to the side's root.
+        """
+        path = []
+        while True:
+            if is_entity:
+                path.append(self.entity_ref(node))
+                if side['entity_dist'][node] == 0:
+                    return path
+                node = int(side['entity_parent'][node])
+            else:
+                path.append(int(self.movie_ids[node]))
+                node = int(side['movie_parent'][node])
+            is_entity = not is_entity
+
+    def bacon_number(self, source_id, target_id, source_kind='person', target_kind='person'):
+        """
+        Number of shared movies on the shortest path between two entities,
+        or None if they are not connected.
+        """
+        path = self.shortest_path(source_id, target_id, source_kind, target_kind)
+        if path is None:
+            return None
+        return len(path) // 2
+
+    def k_hop_neighborhood(self, entity_id, k, kind='person'):
+        """
+        Entities within k co-acting hops of entity_id.
+
+        Returns (entity_refs, distances) where distances[i] is the number
+        of hops to entity_refs[i]. The starting entity itself is excluded.
+        """
+        start = self.entity_index(entity_id, kind)
+        if start is None:
+            return [], np.zeros(0, dtype=np.int32)
+
+        entity_dist = np.full(self.n_entities, -1, dtype=np.int32)
+        movie_seen = np.zeros(self.n_movies, dtype=bool)
+        entity_dist[start] = 0
+        frontier = np.array([start], dtype=np.int64)
+
+        for hop in range(1, k + 1):
+            movies, _ = expand(frontier, self.entity_indptr, self.entity_movies)
+            movies = np.unique(movies[~movie_seen[movies]])
+            movie_seen[movies] = True
+            entities, _ = expand(movies, self.movie_indptr, self.movie_entities)
+            entities = np.unique(entities[entity_dist[entities] < 0])
+            if not len(entities):
+                break
+            entity_dist[entities] = hop
+            frontier = entities.astype(np.int64)
+
+        reached = np.flatnonzero(entity_dist > 0)
+        return [self.entity_ref(i) for i in reached], entity_dist[reached]
+
+    def connected_components(self):
+        """
+        Component label for every entity (the smallest entity row index in
+        its component), computed by vectorized min-label propagation over
+        the movie side. Entities with no movies are their own component.
+        """
+        labels = np.arange(self.n_entities, dtype=np.int64)
+        movie_degree = np.diff(self.movie_indptr)
+        has_cast = np.flatnonzero(movie_degree > 0)
+        edge_movie = np.repeat(np.arange(self.n_movies), movie_degree)
+
+        while True:
+            # Each movie takes the smallest label of its cast...
+            movie_labels = np.full(self.n_movies, self.n_entities, dtype=np.int64)
+            movie_labels[has_cast] = np.minimum.reduceat(
+                labels[self.movie_entities], self.movie_indptr[has_cast]
+            )
+            # ...and every entity takes the smallest label of its movies
+            new_labels = labels.copy()
+            np.minimum.at(new_labels, self.movie_entities, movie_labels[edge_movie])
+            # Pointer jumping: follow labels to their own label to converge faster
+            new_labels = new_labels[new_labels]
+            if np.array_equal(new_labels, labels):
+                return labels
+            labels = new_labels
+
+
+def load_or_build(snapshot_dir, cache_dir, include_directors=False):
+    """
+    Load the cached graph if it was built from the current snapshot,
+    otherwise build it from the snapshot and refresh the cache.
+    """
+    with open(os.path.join(snapshot_dir, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    meta_path = os.path.join(cache_dir, 'meta.json')
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        if (meta.get('format_version') == GRAPH_FORMAT_VERSION
+                and meta.get('load_run_id') == manifest['load_run_id']
+                and meta.get('snapshot_created_at') == manifest.get('created_at')
+                and meta.get('include_directors') == include_directors):
+            return CoactingGraph.load(cache_dir)
+
+    graph = CoactingGraph.from_snapshot(snapshot_dir, include_directors)
+    graph.save(cache_dir)
+    return graph
+
+
+def main():
+    """
+    Load (or build) the co-acting graph and answer degrees-of-separation queries.
+    """
+    snapshot_dir = input("Enter the snapshot directory [moviesdb_snapshot]: ").strip() or 'moviesdb_snapshot'
+    cache_dir = input("Enter the graph cache directory [coacting_graph]: ").strip() or 'coacting_graph'
+
+    start = time.perf_counter()
+    graph = load_or_build(snapshot_dir, cache_dir)
+    print(f"✓ Graph ready in {time.perf_counter() - start:.2f} s: "
+          f"{graph.n_entities} persons, {graph.n_movies} movies, {graph.meta['edges']} edges\n")
+
+    _, tables = load_snapshot(snapshot_dir)
+    person = tables['Person']
+    movie = tables['Movie']
+
+    def person_name(pid):
+        i = int(np.searchsorted(person['id'], pid))
+        return f"{person['fname'][i]} {person['lname'][i]}"
+
+    def movie_name(mid):
+        return movie['name'][int(np.searchsorted(movie['id'], mid))]
+
+    while True:
+        source = input("Enter a person ID (blank to quit): ").strip()
+        if not source:
+            break
+        target = input("Enter another person ID: ").strip()
+        try:
+            source, target = int(source), int(target)
+        except ValueError:
+            print("Person IDs must be integers\n")
+            continue
+
+        start = time.perf_counter()
+        path = graph.shortest_path(source, target)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        if path is None:
+            print(f"No connection found ({elapsed:.1f} ms)\n")
+            continue
+        print(f"Bacon number {len(path) // 2} ({elapsed:.1f} ms):")
+        for step in path:
+            if isinstance(step, tuple):
+                print(f"  {person_name(step[1])} ({step[1]})")
+            else:
+                print(f"    -> {movie_name(step)}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import bz2
+import csv
+import gzip
+import io
+import os
+import queue
+import shutil
+import threading
+import time
+
+# zstandard is optional; .zst inputs need it
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Compressed variants tried (in order) when the plain .txt file is missing
+COMPRESSED_SUFFIXES = ['.gz', '.zst', '.bz2']
+
+# Decompressed bytes handed from the decompression thread per chunk, and
+# how many chunks may be buffered ahead of the parser
+CHUNK_SIZE = 1 << 20
+QUEUE_CHUNKS = 16
+
+
+def find_input(data_dir, filename):
+    """
+    Path of filename in data_dir, or of its first compressed variant
+    (filename.gz, .zst, .bz2) if the plain file does not exist. Returns the
+    plain path when nothing exists, so opening it raises FileNotFoundError.
+    """
+    path = os.path.join(data_dir, filename)
+    if os.path.exists(path):
+        return path
+    for suffix in COMPRESSED_SUFFIXES:
+        if os.path.exists(path + suffix):
+            return path + suffix
+    return path
+
+
+def open_compressed(path):
+    """
+    Binary decompressing file object for path, chosen by its suffix.
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rb')
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError(f"Reading {path} needs zstandard (pip install zstandard)")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return open(path, 'rb')
+
+
+class ThreadedDecompressor(io.RawIOBase):
+    """
+    Raw stream whose bytes are decompressed on a background thread.
+
+    zlib, bz2 and zstd release the GIL while decompressing, so the thread
+    runs alongside the csv parsing in the main thread. At most QUEUE_CHUNKS
+    chunks are buffered, which bounds memory use.
+    """
+
+    def __init__(self, path):
+        self.chunks = queue.Queue(maxsize=QUEUE_CHUNKS)
+        self.buffer = b''
+        self.error = None
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self.decompress, args=(path,), daemon=True)
+        self.thread.start()
+
+    def decompress(self, path):
+        try:
+            with open_compressed(path) as source:
+                while not self.stop.is_set():
+                    chunk = source.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    self.put(chunk)
+        except Exception as e:
+            self.error = e
+        self.put(None)
+
+    def put(self, item):
+        # Give up if the reader was closed early instead of blocking forever
+        while not self.stop.is_set():
+            try:
+                self.chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while not self.buffer:
+            chunk = self.chunks.get()
+            if chunk is None:
+                self.chunks.put(None)  # stay at end of file on later reads
+                if self.error:
+                    raise self.error
+                return 0
+            self.buffer = chunk
+        n = min(len(target), len(self.buffer))
+        target[:n] = self.buffer[:n]
+        self.buffer = self.buffer[n:]
+        return n
+
+    def close(self):
+        self.stop.set()
+        super().close()
+
+
+def open_input(path, encoding='latin-1'):
+    """
+    Open an IMDB input file as text. Compressed files (.gz, .zst, .bz2)
+    are decompressed on a separate thread while the caller parses.
+    """
+    if not any(path.endswith(suffix) for suffix in COMPRESSED_SUFFIXES):
+        return open(path, 'r', encoding=encoding)
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    raw = ThreadedDecompressor(path)
+    return io.TextIOWrapper(io.BufferedReader(raw, CHUNK_SIZE), encoding=encoding)
+
+
+def compress_file(path, suffix):
+    """
+    Write path + suffix next to path (if it does not exist yet).
+    """
+    target = path + suffix
+    if os.path.exists(target):
+        return target
+    with open(path, 'rb') as source:
+        if suffix == '.gz':
+            with gzip.open(target, 'wb', compresslevel=6) as dest:
+                shutil.copyfileobj(source, dest, CHUNK_SIZE)
+        elif suffix == '.bz2':
+            with bz2.open(target, 'wb') as dest:
+                shutil.copyfileobj(source, dest, CHUNK_SIZE)
+        else:
+            with open(target, 'wb') as dest:
+                zstandard.ZstdCompressor(level=3).copy_stream(source, dest)
+    return target
+
+
+def drop_from_page_cache(path):
+    """
+    Ask the kernel to evict path from the page cache (cold-cache timing).
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def read_bytes_so_far():
+    """
+    Bytes this process has read from storage (Linux /proc/self/io), or None.
+    """
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('read_bytes:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def benchmark(data_dir, filenames):
+    """
+    Time a cold-cache read + csv parse of each input in every available
+    format and print time, bytes on disk and bytes read from storage.
+    """
+    suffixes = [''] + [s for s in COMPRESSED_SUFFIXES if s != '.zst' or zstandard is not None]
+    if zstandard is None:
+        print("(zstandard not installed: skipping .zst)")
+
+    print(f"{'File':<28} {'Format':<8} {'Rows':<10} {'Seconds':<10} {'On disk (MB)':<14} {'Read (MB)':<10}")
+    print("-" * 84)
+    for filename in filenames:
+        plain = os.path.join(data_dir, filename)
+        if not os.path.exists(plain):
+            print(f"{filename:<28} (missing)")
+            continue
+        for suffix in suffixes:
+            path = compress_file(plain, suffix) if suffix else plain
+            drop_from_page_cache(path)
+
+            before = read_bytes_so_far()
+            start = time.perf_counter()
+            rows = 0
+            with open_input(path) as f:
+                for _ in csv.reader(f):
+                    rows += 1
+            elapsed = time.perf_counter() - start
+            after = read_bytes_so_far()
+
+            read_mb = f"{(after - before) / 1e6:.1f}" if before is not None else "n/a"
+            print(f"{filename:<28} {suffix or 'plain':<8} {rows:<10} {elapsed:<10.2f} "
+                  f"{os.path.getsize(path) / 1e6:<14.1f} {read_mb:<10}")
+
+
+def main():
+    """
+    Benchmark plain vs compressed IMDB inputs on a cold page cache.
+    """
+    data_dir = input("Enter the path to the directory containing IMDB .txt files: ").strip()
+    if not os.path.isdir(data_dir):
+        print(f"Error: Directory '{data_dir}' does not exist")
+        return
+    print("Creating compressed copies where missing, then timing cold-cache parses...\n")
+    benchmark(data_dir, ["IMDBMovie.txt", "IMDBPerson.txt", "IMDBDirectors.txt",
+                         "IMDBCast.txt", "IMDBMovie_Directors.txt"])
+
+
+if __name__ == "__main__":
+    main()
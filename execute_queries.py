@@ -1,211 +1,16 @@
 import psycopg2
 import getpass
+import os
+from result_writers import FORMAT_EXTENSIONS, check_format, export_cursor
+from telemetry import TELEMETRY, InstrumentedCursor
 
-def execute_queries():
-    """
-    Execute all SQL queries from Task 3 and save results to query_results.txt
-    """
-    
-    # Prompt user for database password
-    print("PostgreSQL Database Connection")
-    db_password = getpass.getpass("Enter PostgreSQL password for user 'postgres': ")
-    
-    # Connect to the moviesdb database
-    try:
-        conn = psycopg2.connect(
-            host="localhost",
-            #dbname="moviesdb", uncomment this before submission
-            dbname="moviesdb3",#for testing purposes, delete before submission
-            user="postgres",
-            password=db_password
-        )
-        cur = conn.cursor()
-        print("Successfully connected to moviesdb database\n")
-        
-        # Open output file
-        with open('query_results.txt', 'w', encoding='utf-8') as f:
-            
-            # Query (a)
-            print("Executing query (a)...")
-            f.write("=" * 80 + "\n")
-            f.write("(a) Persons who acted in both second half of 19th and first half of 20th century\n")
-            f.write("=" * 80 + "\n")
-            
-            cur.execute("""
-                SELECT DISTINCT p.id, p.fname, p.lname, p.gender
-                FROM Person p
-                WHERE EXISTS (
-                    SELECT 1 
-                    FROM ActsIn a1
-                    JOIN Movie m1 ON a1.mid = m1.id
-                    WHERE a1.pid = p.id 
-                      AND m1.year >= 1850 
-                      AND m1.year < 1900
-                )
-                AND EXISTS (
-                    SELECT 1 
-                    FROM ActsIn a2
-                    JOIN Movie m2 ON a2.mid = m2.id
-                    WHERE a2.pid = p.id 
-                      AND m2.year >= 1900 
-                      AND m2.year < 1950
-                )
-                LIMIT 10
-            """)
-            results = cur.fetchall()
-            f.write(f"{'ID':<10} {'First Name':<20} {'Last Name':<20} {'Gender':<10}\n")
-            f.write("-" * 80 + "\n")
-            for row in results:
-                f.write(f"{row[0]:<10} {row[1]:<20} {row[2]:<20} {row[3]:<10}\n")
-            f.write(f"\nTotal rows: {len(results)}\n\n")
-            
-            # Query (b)
-            print("Executing query (b)...")
-            f.write("=" * 80 + "\n")
-            f.write("(b) Directors who directed a film in a leap year\n")
-            f.write("=" * 80 + "\n")
-            
-            cur.execute("""
-                SELECT DISTINCT d.id, d.fname, d.lname
-                FROM Director d
-                JOIN Directs dr ON d.id = dr.did
-                JOIN Movie m ON dr.mid = m.id
-                WHERE m.year IS NOT NULL
-                  AND (m.year % 4 = 0 AND (m.year % 100 != 0 OR m.year % 400 = 0))
-                LIMIT 10
-            """)
-            results = cur.fetchall()
-            f.write(f"{'ID':<10} {'First Name':<20} {'Last Name':<20}\n")
-            f.write("-" * 80 + "\n")
-            for row in results:
-                f.write(f"{row[0]:<10} {row[1]:<20} {row[2]:<20}\n")
-            f.write(f"\nTotal rows: {len(results)}\n\n")
-            
-            # Query (c)
-            print("Executing query (c)...")
-            f.write("=" * 80 + "\n")
-            f.write("(c) Top 10 movies with same year as 'Shrek (2001)' but better rank\n")
-            f.write("=" * 80 + "\n")
-            
-            cur.execute("""
-                SELECT m.id, m.name, m.year, m.rank
-                FROM Movie m
-                WHERE m.year = (SELECT year FROM Movie WHERE name = 'Shrek (2001)')
-                  AND m.rank > (SELECT rank FROM Movie WHERE name = 'Shrek (2001)')
-                ORDER BY m.rank DESC
-                LIMIT 10
-            """)
-            results = cur.fetchall()
-            f.write(f"{'ID':<10} {'Name':<50} {'Year':<10} {'Rank':<10}\n")
-            f.write("-" * 80 + "\n")
-            for row in results:
-                f.write(f"{row[0]:<10} {row[1]:<50} {row[2]:<10} {row[3]:<10.2f}\n")
-            f.write(f"\nTotal rows: {len(results)}\n\n")
-            
-            # Query (d)
-            print("Executing query (d)...")
-            f.write("=" * 80 + "\n")
-            f.write("(d) Top 10 directors by number of films directed\n")
-            f.write("=" * 80 + "\n")
-            
-            cur.execute("""
-                SELECT d.id, d.fname, d.lname, COUNT(dr.mid) AS num_films
-                FROM Director d
-                JOIN Directs dr ON d.id = dr.did
-                GROUP BY d.id, d.fname, d.lname
-                ORDER BY num_films DESC
-                LIMIT 10
-            """)
-            results = cur.fetchall()
-            f.write(f"{'ID':<10} {'First Name':<20} {'Last Name':<20} {'# Films':<10}\n")
-            f.write("-" * 80 + "\n")
-            for row in results:
-                f.write(f"{row[0]:<10} {row[1]:<20} {row[2]:<20} {row[3]:<10}\n")
-            f.write(f"\nTotal rows: {len(results)}\n\n")
-            
-            # Query (e) - Largest
-            print("Executing query (e) - largest...")
-            f.write("=" * 80 + "\n")
-            f.write("(e) Movies with LARGEST number of actors\n")
-            f.write("=" * 80 + "\n")
-            
-            cur.execute("""
-                WITH ActorCounts AS (
-                    SELECT m.id, m.name, m.year, COUNT(a.pid) AS num_actors
-                    FROM Movie m
-                    JOIN ActsIn a ON m.id = a.mid
-                    GROUP BY m.id, m.name, m.year
-                )
-                SELECT id, name, year, num_actors
-                FROM ActorCounts
-                WHERE num_actors = (SELECT MAX(num_actors) FROM ActorCounts)
-                ORDER BY id
-            """)
-            results = cur.fetchall()
-            f.write(f"{'ID':<10} {'Name':<50} {'Year':<10} {'# Actors':<10}\n")
-            f.write("-" * 80 + "\n")
-            for row in results:
-                f.write(f"{row[0]:<10} {row[1]:<50} {row[2]:<10} {row[3]:<10}\n")
-            f.write(f"\nTotal rows: {len(results)}\n\n")
-            
-            # Query (e) - Smallest
-            print("Executing query (e) - smallest...")
-            f.write("=" * 80 + "\n")
-            f.write("(e) Movies with SMALLEST number of actors\n")
-            f.write("=" * 80 + "\n")
-            
-            cur.execute("""
-                WITH ActorCounts AS (
-                    SELECT m.id, m.name, m.year, COUNT(a.pid) AS num_actors
-                    FROM Movie m
-                    JOIN ActsIn a ON m.id = a.mid
-                    GROUP BY m.id, m.name, m.year
-                )
-                SELECT id, name, year, num_actors
-                FROM ActorCounts
-                WHERE num_actors = (SELECT MIN(num_actors) FROM ActorCounts)
-                ORDER BY id
-                LIMIT 10
-            """)
-            results = cur.fetchall()
-            f.write(f"{'ID':<10} {'Name':<50} {'Year':<10} {'# Actors':<10}\n")
-            f.write("-" * 80 + "\n")
-            for row in results:
-                f.write(f"{row[0]:<10} {row[1]:<50} {row[2]:<10} {row[3]:<10}\n")
-            f.write(f"\nTotal rows: {len(results)}\n\n")
-            
-            # Query (f)
-            print("Executing query (f)...")
-            f.write("=" * 80 + "\n")
-            f.write("(f) Actors who worked with at least 10 distinct directors\n")
-            f.write("=" * 80 + "\n")
-            
-            cur.execute("""
-                SELECT p.id, p.fname, p.lname, COUNT(DISTINCT dr.did) AS num_directors
-                FROM Person p
-                JOIN ActsIn a ON p.id = a.pid
-                JOIN Directs dr ON a.mid = dr.mid
-                GROUP BY p.id, p.fname, p.lname
-                HAVING COUNT(DISTINCT dr.did) >= 10
-                ORDER BY num_directors DESC
-                LIMIT 10
-            """)
-            results = cur.fetchall()
-            f.write(f"{'ID':<10} {'First Name':<20} {'Last Name':<20} {'# Directors':<12}\n")
-            f.write("-" * 80 + "\n")
-            for row in results:
-                f.write(f"{row[0]:<10} {row[1]:<20} {row[2]:<20} {row[3]:<12}\n")
-            f.write(f"\nTotal rows: {len(results)}\n\n")
-        
-        print("\n✓ All queries executed successfully!")
-        print("✓ Results saved to query_results.txt")
-        
-        # Also create sql.txt with just the queries
-        with open('sql.txt', 'w', encoding='utf-8') as f:
-            f.write("-- SQL Queries for Task 3\n\n")
-            
-            f.write("-- (a) Persons who acted in both second half of 19th and first half of 20th century\n")
-            f.write("""SELECT DISTINCT p.id, p.fname, p.lname, p.gender
+# Task 3 queries, in the order they appear in query_results.txt and sql.txt.
+# 'header' and 'row_format' define the fixed-width text layout of each section.
+QUERIES = [
+    {
+        'name': 'a',
+        'title': "(a) Persons who acted in both second half of 19th and first half of 20th century",
+        'sql': """SELECT DISTINCT p.id, p.fname, p.lname, p.gender
 FROM Person p
 WHERE EXISTS (
     SELECT 1 
@@ -223,43 +28,51 @@ AND EXISTS (
       AND m2.year >= 1900 
       AND m2.year < 1950
 )
-LIMIT 10;
-
-""")
-            
-            f.write("-- (b) Directors who directed a film in a leap year\n")
-            f.write("""SELECT DISTINCT d.id, d.fname, d.lname
+LIMIT 10""",
+        'header': f"{'ID':<10} {'First Name':<20} {'Last Name':<20} {'Gender':<10}",
+        'row_format': "{0:<10} {1:<20} {2:<20} {3:<10}",
+    },
+    {
+        'name': 'b',
+        'title': "(b) Directors who directed a film in a leap year",
+        'sql': """SELECT DISTINCT d.id, d.fname, d.lname
 FROM Director d
 JOIN Directs dr ON d.id = dr.did
 JOIN Movie m ON dr.mid = m.id
 WHERE m.year IS NOT NULL
   AND (m.year % 4 = 0 AND (m.year % 100 != 0 OR m.year % 400 = 0))
-LIMIT 10;
-
-""")
-            
-            f.write("-- (c) Top 10 movies with same year as 'Shrek (2001)' but better rank\n")
-            f.write("""SELECT m.id, m.name, m.year, m.rank
+LIMIT 10""",
+        'header': f"{'ID':<10} {'First Name':<20} {'Last Name':<20}",
+        'row_format': "{0:<10} {1:<20} {2:<20}",
+    },
+    {
+        'name': 'c',
+        'title': "(c) Top 10 movies with same year as 'Shrek (2001)' but better rank",
+        'sql': """SELECT m.id, m.name, m.year, m.rank
 FROM Movie m
 WHERE m.year = (SELECT year FROM Movie WHERE name = 'Shrek (2001)')
   AND m.rank > (SELECT rank FROM Movie WHERE name = 'Shrek (2001)')
 ORDER BY m.rank DESC
-LIMIT 10;
-
-""")
-            
-            f.write("-- (d) Top 10 directors by number of films directed\n")
-            f.write("""SELECT d.id, d.fname, d.lname, COUNT(dr.mid) AS num_films
+LIMIT 10""",
+        'header': f"{'ID':<10} {'Name':<50} {'Year':<10} {'Rank':<10}",
+        'row_format': "{0:<10} {1:<50} {2:<10} {3:<10.2f}",
+    },
+    {
+        'name': 'd',
+        'title': "(d) Top 10 directors by number of films directed",
+        'sql': """SELECT d.id, d.fname, d.lname, COUNT(dr.mid) AS num_films
 FROM Director d
 JOIN Directs dr ON d.id = dr.did
 GROUP BY d.id, d.fname, d.lname
 ORDER BY num_films DESC
-LIMIT 10;
-
-""")
-            
-            f.write("-- (e) Movies with LARGEST number of actors\n")
-            f.write("""WITH ActorCounts AS (
+LIMIT 10""",
+        'header': f"{'ID':<10} {'First Name':<20} {'Last Name':<20} {'# Films':<10}",
+        'row_format': "{0:<10} {1:<20} {2:<20} {3:<10}",
+    },
+    {
+        'name': 'e_largest',
+        'title': "(e) Movies with LARGEST number of actors",
+        'sql': """WITH ActorCounts AS (
     SELECT m.id, m.name, m.year, COUNT(a.pid) AS num_actors
     FROM Movie m
     JOIN ActsIn a ON m.id = a.mid
@@ -268,12 +81,14 @@ LIMIT 10;
 SELECT id, name, year, num_actors
 FROM ActorCounts
 WHERE num_actors = (SELECT MAX(num_actors) FROM ActorCounts)
-ORDER BY id;
-
-""")
-            
-            f.write("-- (e) Movies with SMALLEST number of actors\n")
-            f.write("""WITH ActorCounts AS (
+ORDER BY id""",
+        'header': f"{'ID':<10} {'Name':<50} {'Year':<10} {'# Actors':<10}",
+        'row_format': "{0:<10} {1:<50} {2:<10} {3:<10}",
+    },
+    {
+        'name': 'e_smallest',
+        'title': "(e) Movies with SMALLEST number of actors",
+        'sql': """WITH ActorCounts AS (
     SELECT m.id, m.name, m.year, COUNT(a.pid) AS num_actors
     FROM Movie m
     JOIN ActsIn a ON m.id = a.mid
@@ -283,28 +98,128 @@ SELECT id, name, year, num_actors
 FROM ActorCounts
 WHERE num_actors = (SELECT MIN(num_actors) FROM ActorCounts)
 ORDER BY id
-LIMIT 10;
-
-""")
-            
-            f.write("-- (f) Actors who worked with at least 10 distinct directors\n")
-            f.write("""SELECT p.id, p.fname, p.lname, COUNT(DISTINCT dr.did) AS num_directors
+LIMIT 10""",
+        'header': f"{'ID':<10} {'Name':<50} {'Year':<10} {'# Actors':<10}",
+        'row_format': "{0:<10} {1:<50} {2:<10} {3:<10}",
+    },
+    {
+        'name': 'f',
+        'title': "(f) Actors who worked with at least 10 distinct directors",
+        'sql': """SELECT p.id, p.fname, p.lname, COUNT(DISTINCT dr.did) AS num_directors
 FROM Person p
 JOIN ActsIn a ON p.id = a.pid
 JOIN Directs dr ON a.mid = dr.mid
 GROUP BY p.id, p.fname, p.lname
 HAVING COUNT(DISTINCT dr.did) >= 10
 ORDER BY num_directors DESC
-LIMIT 10;
-""")
-        
+LIMIT 10""",
+        'header': f"{'ID':<10} {'First Name':<20} {'Last Name':<20} {'# Directors':<12}",
+        'row_format': "{0:<10} {1:<20} {2:<20} {3:<12}",
+    },
+]
+
+
+def write_text_section(f, query, results):
+    """
+    Write one query's results as a fixed-width section of query_results.txt
+    """
+    f.write("=" * 80 + "\n")
+    f.write(query['title'] + "\n")
+    f.write("=" * 80 + "\n")
+    f.write(query['header'] + "\n")
+    f.write("-" * 80 + "\n")
+    for row in results:
+        f.write(query['row_format'].format(*row) + "\n")
+    f.write(f"\nTotal rows: {len(results)}\n\n")
+
+
+def write_sql_file(filename='sql.txt'):
+    """
+    Write the Task 3 queries (without results) to filename
+    """
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write("-- SQL Queries for Task 3\n\n")
+        for i, query in enumerate(QUERIES):
+            f.write(f"-- {query['title']}\n")
+            f.write(query['sql'] + ";\n")
+            if i < len(QUERIES) - 1:
+                f.write("\n")
+
+
+def query_label(query):
+    """
+    Console label for a query, e.g. '(a)' or '(e) - largest'
+    """
+    letter, _, variant = query['name'].partition('_')
+    return f"({letter}) - {variant}" if variant else f"({letter})"
+
+
+def execute_queries(output_format='text', output_dir='.'):
+    """
+    Execute all SQL queries from Task 3 and save results to query_results.txt
+
+    With output_format 'csv', 'jsonl', 'arrow' or 'parquet', each query's
+    result is instead written to its own file query_results_<name>.<ext>
+    in output_dir, fetched from the cursor in large batches.
+    """
+
+    if output_format != 'text':
+        check_format(output_format)
+
+    # Prompt user for database password
+    print("PostgreSQL Database Connection")
+    db_password = getpass.getpass("Enter PostgreSQL password for user 'postgres': ")
+
+    # Connect to the moviesdb database
+    try:
+        conn = psycopg2.connect(
+            host="localhost",
+            #dbname="moviesdb", uncomment this before submission
+            dbname="moviesdb3",#for testing purposes, delete before submission
+            user="postgres",
+            password=db_password,
+            cursor_factory=InstrumentedCursor
+        )
+        cur = conn.cursor()
+        print("Successfully connected to moviesdb database\n")
+
+        if output_format == 'text':
+            # Open output file
+            with open('query_results.txt', 'w', encoding='utf-8') as f:
+                for query in QUERIES:
+                    print(f"Executing query {query_label(query)}...")
+                    cur.query_name = query['name']
+                    cur.execute(query['sql'])
+                    results = cur.fetchall()
+                    with TELEMETRY.formatting(query['name']):
+                        write_text_section(f, query, results)
+
+            print("\n✓ All queries executed successfully!")
+            print("✓ Results saved to query_results.txt")
+        else:
+            for query in QUERIES:
+                print(f"Executing query {query_label(query)}...")
+                path = os.path.join(
+                    output_dir,
+                    f"query_results_{query['name']}{FORMAT_EXTENSIONS[output_format]}"
+                )
+                cur.query_name = query['name']
+                cur.execute(query['sql'])
+                export_cursor(cur, output_format, path)
+
+            print("\n✓ All queries executed successfully!")
+            print(f"✓ Results saved to {output_dir} as {output_format} files")
+
+        # Also create sql.txt with just the queries
+        write_sql_file('sql.txt')
+
         print("✓ SQL queries saved to sql.txt")
-        
+
     except psycopg2.Error as e:
         print(f"\nDatabase error: {e}")
         if conn:
             conn.rollback()
-    
+
     finally:
         # Close cursor and connection
         if cur:
@@ -0,0 +1,497 @@
+import csv
+import getpass
+import json
+import os
+import shutil
+import time
+import uuid
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from movie_facets import refresh_movies
+from movie_ranks import refresh_years
+from parallel_parse import RANGE_END_SENTINEL, LineReader
+from telemetry import InstrumentedCursor
+
+# Micro-batch limits: a batch is committed when it reaches MAX_BATCH_ROWS
+# rows or when its oldest row has waited MAX_BATCH_LATENCY seconds
+MAX_BATCH_ROWS = 5000
+MAX_BATCH_LATENCY = 2.0
+POLL_INTERVAL = 0.5
+
+# Cast/directing rows whose person, director or movie has not arrived yet
+# are retried for this long before being dropped (the batch loader drops
+# them too, but it sees every movie before any cast row)
+ORPHAN_TIMEOUT = 60.0
+
+# How often (seconds) the throughput/lag summary is printed
+REPORT_INTERVAL = 30.0
+
+STATE_FILE = 'ingest_state.json'
+
+
+def parse_movie(row):
+    if len(row) < 4:
+        return None
+    return (int(row[0]), row[1], int(row[2]) if row[2] else None,
+            float(row[3]) if row[3] else None)
+
+
+def parse_person(row):
+    if len(row) < 4:
+        return None
+    return (int(row[0]), row[1], row[2], row[3])
+
+
+def parse_director(row):
+    if len(row) < 3:
+        return None
+    return (int(row[0]), row[1], row[2])
+
+
+def parse_cast(row):
+    if len(row) < 2:
+        return None
+    return (int(row[0]), int(row[1]), row[2] if len(row) > 2 else '')
+
+
+def parse_directs(row):
+    if len(row) < 2:
+        return None
+    return (int(row[0]), int(row[1]))
+
+
+# Input files in load order: entity tables first so that the cast and
+# directing rows of the same batch can find their movies and people.
+# key: number of leading columns that identify a row (duplicates are skipped)
+# fks: (column index, referenced table) pairs that must exist
+TABLE_SPECS = [
+    {'file': 'IMDBMovie.txt', 'table': 'Movie', 'parse': parse_movie,
+     'columns': ['id', 'name', 'year', 'rank'],
+     'types': ['integer', 'text', 'integer', 'real'], 'key': 1, 'fks': []},
+    {'file': 'IMDBPerson.txt', 'table': 'Person', 'parse': parse_person,
+     'columns': ['id', 'fname', 'lname', 'gender'],
+     'types': ['integer', 'text', 'text', 'text'], 'key': 1, 'fks': []},
+    {'file': 'IMDBDirectors.txt', 'table': 'Director', 'parse': parse_director,
+     'columns': ['id', 'fname', 'lname'],
+     'types': ['integer', 'text', 'text'], 'key': 1, 'fks': []},
+    {'file': 'IMDBCast.txt', 'table': 'ActsIn', 'parse': parse_cast,
+     'columns': ['pid', 'mid', 'role'],
+     'types': ['integer', 'integer', 'text'], 'key': 2,
+     'fks': [(0, 'Person'), (1, 'Movie')]},
+    {'file': 'IMDBMovie_Directors.txt', 'table': 'Directs', 'parse': parse_directs,
+     'columns': ['did', 'mid'],
+     'types': ['integer', 'integer'], 'key': 2,
+     'fks': [(0, 'Director'), (1, 'Movie')]},
+]
+
+# Column holding the movie id in the tables whose rows change a movie's
+# MovieFacets row
+FACET_MID_COLUMN = {'Movie': 0, 'ActsIn': 1, 'Directs': 1}
+
+
+def spec_for_file(filename):
+    """
+    Table spec for an input file. Spool files may carry a suffix
+    (IMDBCast.0001.txt); the longest matching base name wins.
+    """
+    best = None
+    for spec in TABLE_SPECS:
+        base = spec['file'][:-len('.txt')]
+        if filename == spec['file'] or (filename.startswith(base + '.') and filename.endswith('.txt')):
+            if best is None or len(spec['file']) > len(best['file']):
+                best = spec
+    return best
+
+
+def read_new_records(path, offset):
+    """
+    Parse the complete records appended to path since offset, the way the
+    batch loader's csv.reader does (a quoted field may span lines).
+    Returns (rows, new_offset); new_offset is the end of the last complete
+    record, so a trailing partial record is read again by the next poll.
+    """
+    size = os.path.getsize(path)
+    if size < offset:
+        # File was truncated or replaced: start over from the beginning
+        offset = 0
+    if size == offset:
+        return [], offset
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(size - offset)
+    end = data.rfind(b'\n')
+    if end < 0:
+        return [], offset
+    # The sentinel line comes back as a record of its own unless the data
+    # ends inside a quoted field, which then swallows it
+    lines = LineReader(data[:end + 1] + RANGE_END_SENTINEL.encode() + b'\n', 0)
+    rows = []
+    record_end = 0
+    for row in csv.reader(lines):
+        if row == [RANGE_END_SENTINEL]:
+            break
+        if lines.pos > end + 1:
+            break  # partial record, completed by a later append
+        rows.append(row)
+        record_end = lines.pos
+    return rows, offset + record_end
+
+
+def insert_batch(cur, spec, rows):
+    """
+    Insert rows into spec's table with the batch loader's rules: first
+    occurrence of a key wins, duplicates of existing rows are skipped and
+    rows with missing foreign keys are not inserted.
+    Returns (inserted_keys, duplicates, orphan_rows).
+    """
+    key_len = spec['key']
+    table = spec['table']
+    columns = spec['columns']
+    template = "(" + ", ".join(f"%s::{t}" for t in spec['types']) + ")"
+    values_alias = f"v({', '.join(columns)})"
+
+    # Keep the first row for each key within the batch
+    unique = {}
+    for row in rows:
+        unique.setdefault(row[:key_len], row)
+    duplicates = len(rows) - len(unique)
+    rows = list(unique.values())
+
+    orphans = []
+    if spec['fks']:
+        fk_checks = " AND ".join(
+            f"EXISTS (SELECT 1 FROM {ref} r WHERE r.id = v.{columns[i]})"
+            for i, ref in spec['fks']
+        )
+        # execute_values sends the rows inlined in the SQL, so the
+        # statements are named for telemetry rather than by their text
+        cur.query_name = f"follow_{table.lower()}_fk_check"
+        valid = set(execute_values(
+            cur,
+            f"SELECT {', '.join('v.' + c for c in columns[:key_len])} "
+            f"FROM (VALUES %s) {values_alias} WHERE {fk_checks}",
+            rows, template=template, page_size=1000, fetch=True
+        ))
+        orphans = [row for row in rows if row[:key_len] not in valid]
+        rows = [row for row in rows if row[:key_len] in valid]
+
+    if not rows:
+        cur.query_name = None
+        return [], duplicates, orphans
+
+    cur.query_name = f"follow_{table.lower()}_insert"
+    key_match = " AND ".join(f"t.{c} = v.{c}" for c in columns[:key_len])
+    inserted = execute_values(
+        cur,
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"SELECT * FROM (VALUES %s) {values_alias} "
+        f"WHERE NOT EXISTS (SELECT 1 FROM {table} t WHERE {key_match}) "
+        f"RETURNING {', '.join(columns[:key_len])}",
+        rows, template=template, page_size=1000, fetch=True
+    )
+    cur.query_name = None
+    return [tuple(key) for key in inserted], duplicates + len(rows) - len(inserted), orphans
+
+
+class FollowIngester:
+    """
+    Tails the IMDB*.txt files (or a spool directory of new files), parses
+    appended records into micro-batches and commits them.
+    """
+
+    def __init__(self, conn, data_dir, spool_dir=None, state_file=STATE_FILE):
+        self.conn = conn
+        self.data_dir = data_dir
+        self.spool_dir = spool_dir
+        self.state_file = state_file
+        # Saved offsets only move past lines whose rows are all committed
+        # (or dropped); read_offsets is how far the files have been read
+        self.offsets = self.load_offsets()
+        self.read_offsets = dict(self.offsets)
+
+        # Pending rows per table: list of (row, observed_at, source). source
+        # is (file, offset of the chunk the row was read from) for followed
+        # files and (spool file name, None) for spool files.
+        self.pending = {spec['table']: [] for spec in TABLE_SPECS}
+        self.oldest_pending = None
+        # Rows queued since the last flush. Only these make a batch due:
+        # orphans kept for retry can only succeed once new rows arrive.
+        self.new_rows = 0
+        self.oldest_new = None
+        # Spool files read so far; moved to done/ once none of their rows
+        # is pending
+        self.spooled = []
+
+        # Totals for reporting
+        self.stats = {'batches': 0, 'rows': 0, 'invalid': 0, 'duplicates': 0,
+                      'orphans_dropped': 0, 'lag_sum': 0.0, 'lag_max': 0.0,
+                      'lag_count': 0, 'busy_seconds': 0.0}
+        self.report_started = time.time()
+
+    def load_offsets(self):
+        """
+        Byte offsets already ingested. On the first run, follow from the
+        current end of each file (the batch loader has loaded the rest).
+        """
+        if os.path.exists(self.state_file):
+            with open(self.state_file, encoding='utf-8') as f:
+                return json.load(f)
+        offsets = {}
+        for spec in TABLE_SPECS:
+            path = os.path.join(self.data_dir, spec['file'])
+            offsets[spec['file']] = os.path.getsize(path) if os.path.exists(path) else 0
+        return offsets
+
+    def save_offsets(self):
+        """
+        Save, per followed file, the offset up to which every row is
+        committed or dropped: the read offset, or the start of the oldest
+        chunk that still has pending rows. Those rows are read again after
+        a restart (rows of the chunk that were committed are then skipped
+        as duplicates).
+        """
+        self.offsets = dict(self.read_offsets)
+        for rows in self.pending.values():
+            for _, _, (name, chunk_start) in rows:
+                if chunk_start is not None:
+                    self.offsets[name] = min(self.offsets[name], chunk_start)
+        tmp = self.state_file + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.offsets, f)
+        os.replace(tmp, self.state_file)
+
+    def retire_spool_files(self):
+        """
+        Move spool files none of whose rows is pending any more to done/.
+        """
+        pending_files = {name for rows in self.pending.values()
+                         for _, _, (name, chunk_start) in rows if chunk_start is None}
+        done = [name for name in self.spooled if name not in pending_files]
+        if not done:
+            return
+        done_dir = os.path.join(self.spool_dir, 'done')
+        os.makedirs(done_dir, exist_ok=True)
+        for name in done:
+            shutil.move(os.path.join(self.spool_dir, name), os.path.join(done_dir, name))
+        self.spooled = [name for name in self.spooled if name in pending_files]
+
+    def add_rows(self, spec, rows, observed_at, source):
+        """
+        Validate csv rows and queue the valid ones, tagged with the source
+        they were read from.
+        """
+        for row in rows:
+            try:
+                parsed = spec['parse'](row)
+            except (ValueError, IndexError):
+                parsed = None
+            if parsed is None:
+                self.stats['invalid'] += 1
+                continue
+            self.pending[spec['table']].append((parsed, observed_at, source))
+            self.new_rows += 1
+            if self.oldest_pending is None:
+                self.oldest_pending = observed_at
+            if self.oldest_new is None:
+                self.oldest_new = observed_at
+
+    def poll(self):
+        """
+        Pick up appended lines (follow mode) and new files (spool mode).
+        """
+        now = time.time()
+        for spec in TABLE_SPECS:
+            path = os.path.join(self.data_dir, spec['file'])
+            if not os.path.exists(path):
+                continue
+            chunk_start = self.read_offsets.get(spec['file'], 0)
+            if os.path.getsize(path) < chunk_start:
+                chunk_start = 0  # truncated or replaced: read_new_records starts over
+            rows, self.read_offsets[spec['file']] = read_new_records(path, chunk_start)
+            if rows:
+                self.add_rows(spec, rows, now, (spec['file'], chunk_start))
+
+        if self.spool_dir:
+            for name in sorted(os.listdir(self.spool_dir)):
+                spec = spec_for_file(name)
+                path = os.path.join(self.spool_dir, name)
+                if spec is None or name in self.spooled or not os.path.isfile(path):
+                    continue
+                # Read like the batch loader reads its input files
+                with open(path, 'r', encoding='latin-1') as f:
+                    rows = list(csv.reader(f))
+                # Spool files carry the same header line as the full files
+                self.add_rows(spec, rows[1:], now, (name, None))
+                self.spooled.append(name)
+
+    def pending_rows(self):
+        return sum(len(rows) for rows in self.pending.values())
+
+    def due(self):
+        """
+        True when the pending micro-batch should be committed: new rows
+        reached the size or latency limit, or a retried orphan timed out
+        (it is then dropped and stops holding back the saved offsets).
+        """
+        now = time.time()
+        if self.oldest_new is not None:
+            return (self.new_rows >= MAX_BATCH_ROWS
+                    or now - self.oldest_new >= MAX_BATCH_LATENCY)
+        return self.oldest_pending is not None and now - self.oldest_pending >= ORPHAN_TIMEOUT
+
+    def flush(self):
+        """
+        Commit all pending rows in one transaction, in FK order.
+        """
+        start = time.time()
+        cur = self.conn.cursor()
+        retry = {}
+        committed = []
+        try:
+            for spec in TABLE_SPECS:
+                queued = self.pending[spec['table']]
+                if not queued:
+                    continue
+                first_seen = {}
+                for row, observed_at, source in queued:
+                    first_seen.setdefault(row[:spec['key']], (observed_at, source))
+                inserted_keys, duplicates, orphans = insert_batch(cur, spec, [row for row, _, _ in queued])
+                inserted = len(inserted_keys)
+                if spec['table'] == 'Movie' and inserted:
+                    # New movies shift the rank positions of their years
+                    refresh_years(cur, [row[2] for row, _, _ in queued])
+                if spec['table'] in FACET_MID_COLUMN and inserted:
+                    # Keep the facets (directors, cast) of the touched movies current
+                    column = FACET_MID_COLUMN[spec['table']]
+                    refresh_movies(cur, [row[column] for row, _, _ in queued])
+                self.stats['rows'] += inserted
+                self.stats['duplicates'] += duplicates
+
+                # Retry orphans in later batches until they time out
+                kept = [(row,) + first_seen[row[:spec['key']]] for row in orphans
+                        if start - first_seen[row[:spec['key']]][0] < ORPHAN_TIMEOUT]
+                self.stats['orphans_dropped'] += len(orphans) - len(kept)
+                retry[spec['table']] = kept
+                committed.extend(first_seen[key][0] for key in inserted_keys)
+            if committed:
+                # New version id, so snapshots of the previous contents are
+                # no longer current (snapshot.snapshot_is_current)
+                cur.execute("UPDATE LoadInfo SET run_id = %s, loaded_at = now()",
+                            (uuid.uuid4().hex,))
+            self.conn.commit()
+        except psycopg2.Error:
+            self.conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+        commit_time = time.time()
+        new_rows = self.new_rows
+        self.new_rows = 0
+        self.oldest_new = None
+        for table in self.pending:
+            self.pending[table] = retry.get(table, [])
+        # Only advance the saved offsets (and retire spool files) past rows
+        # that are committed or dropped; orphans kept for retry hold them back
+        self.save_offsets()
+        if self.spooled:
+            self.retire_spool_files()
+        remaining = [t for rows in self.pending.values() for _, t, _ in rows]
+        self.oldest_pending = min(remaining) if remaining else None
+
+        # Freshness lag of the rows actually inserted by this batch
+        lags = [commit_time - t for t in committed]
+        if new_rows:
+            self.stats['batches'] += 1
+        self.stats['lag_sum'] += sum(lags)
+        self.stats['lag_max'] = max([self.stats['lag_max']] + lags)
+        self.stats['busy_seconds'] += commit_time - start
+        self.stats['lag_count'] += len(lags)
+
+    def report(self):
+        """
+        Print throughput and freshness lag since the last report, then reset.
+        """
+        elapsed = time.time() - self.report_started
+        s = self.stats
+        avg_lag = s['lag_sum'] / s['lag_count'] if s['lag_count'] else 0.0
+        busy = s['busy_seconds'] or 1e-9
+        print(f"[{time.strftime('%H:%M:%S')}] {s['batches']} batches, {s['rows']} rows "
+              f"({s['rows'] / elapsed:.0f} rows/s overall, {s['rows'] / busy:.0f} rows/s while committing), "
+              f"lag avg {avg_lag:.2f} s / max {s['lag_max']:.2f} s, "
+              f"{s['invalid']} invalid, {s['duplicates']} duplicates, "
+              f"{s['orphans_dropped']} dropped for missing keys, "
+              f"{self.pending_rows()} pending")
+        self.stats = {key: 0 if isinstance(value, int) else 0.0 for key, value in s.items()}
+        self.report_started = time.time()
+
+    def run(self):
+        """
+        Poll, batch and commit until interrupted with Ctrl+C.
+        """
+        last_report = time.time()
+        try:
+            while True:
+                self.poll()
+                if self.due():
+                    self.flush()
+                if time.time() - last_report >= REPORT_INTERVAL:
+                    self.report()
+                    last_report = time.time()
+                time.sleep(POLL_INTERVAL)
+        except KeyboardInterrupt:
+            print("\nStopping: committing pending rows...")
+            if self.oldest_pending is not None:
+                self.flush()
+            if self.pending_rows():
+                # Their lines stay behind the saved offsets (and their spool
+                # files in the spool directory), so they are read again next run
+                print(f"{self.pending_rows()} rows still wait for missing keys; "
+                      f"they will be retried on the next run")
+            self.report()
+
+
+def main():
+    """
+    Follow the IMDB files (and optionally a spool directory) and ingest
+    appended records in micro-batches.
+    """
+    print("PostgreSQL Database Connection")
+    db_password = getpass.getpass("Enter PostgreSQL password for user 'postgres': ")
+
+    data_dir = input("Enter the path to the directory containing IMDB .txt files: ").strip()
+    if not os.path.isdir(data_dir):
+        print(f"Error: Directory '{data_dir}' does not exist")
+        return
+    spool_dir = input("Enter a spool directory to watch (blank for none): ").strip() or None
+    if spool_dir and not os.path.isdir(spool_dir):
+        print(f"Error: Directory '{spool_dir}' does not exist")
+        return
+
+    conn = None
+    try:
+        conn = psycopg2.connect(
+            host="localhost",
+            dbname="moviesdb",
+            user="postgres",
+            password=db_password,
+            cursor_factory=InstrumentedCursor
+        )
+        print("Successfully connected to moviesdb database\n")
+        print(f"Following {data_dir}" + (f" and spool {spool_dir}" if spool_dir else "")
+              + f" (batches of up to {MAX_BATCH_ROWS} rows or {MAX_BATCH_LATENCY} s). Ctrl+C to stop.")
+        FollowIngester(conn, data_dir, spool_dir).run()
+
+    except psycopg2.Error as e:
+        print(f"\nDatabase error: {e}")
+
+    finally:
+        if conn:
+            conn.close()
+        print("\nDatabase connection closed")
+
+
+if __name__ == "__main__":
+    main()
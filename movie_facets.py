@@ -0,0 +1,76 @@
+# Per-movie facet data for the faceted top-k queries of task4.py, built by
+# the loader. Only movies with a year and a rank can appear in a top-k
+# result, so only those are kept.
+#   director_ids     sorted ids of the movie's directors
+#   cast_size        number of ActsIn rows of the movie
+#   female_cast      how many of them are persons with gender 'F'
+#   majority_female  more than half of the cast is female
+def facets_select(restrict=False):
+    """
+    SELECT computing the MovieFacets rows. With restrict=True, only the
+    movies in the %(mids)s parameter are computed (the filter is applied
+    inside each aggregate so only their rows are read).
+    """
+    def only(column):
+        return f" AND {column} = ANY(%(mids)s)" if restrict else ""
+
+    return f"""
+        SELECT m.id AS mid, m.name, m.year, m.rank,
+               COALESCE(d.director_ids, '{{}}') AS director_ids,
+               COALESCE(c.cast_size, 0) AS cast_size,
+               COALESCE(c.female_cast, 0) AS female_cast,
+               COALESCE(c.female_cast, 0) * 2 > COALESCE(c.cast_size, 0) AS majority_female
+        FROM Movie m
+        LEFT JOIN (
+            SELECT mid, array_agg(did ORDER BY did) AS director_ids
+            FROM Directs
+            WHERE TRUE{only('mid')}
+            GROUP BY mid
+        ) d ON d.mid = m.id
+        LEFT JOIN (
+            SELECT a.mid, COUNT(*) AS cast_size,
+                   COUNT(*) FILTER (WHERE p.gender = 'F') AS female_cast
+            FROM ActsIn a
+            JOIN Person p ON p.id = a.pid
+            WHERE TRUE{only('a.mid')}
+            GROUP BY a.mid
+        ) c ON c.mid = m.id
+        WHERE m.year IS NOT NULL AND m.rank IS NOT NULL{only('m.id')}
+    """
+
+# (year, rank) for year-range top-k, a GIN index for director containment
+# and a partial (year, rank) index over the majority-female movies only.
+# Actor filters use ActsIn's own index on pid.
+MOVIE_FACET_INDEXES = [
+    "CREATE INDEX idx_moviefacets_year_rank ON MovieFacets(year, rank)",
+    "CREATE INDEX idx_moviefacets_directors ON MovieFacets USING gin (director_ids)",
+    "CREATE INDEX idx_moviefacets_female_year_rank ON MovieFacets(year, rank) WHERE majority_female",
+]
+
+
+def create_movie_facets(cur):
+    """
+    (Re)build the MovieFacets table from Movie, Directs, ActsIn and Person.
+    """
+    cur.execute("DROP TABLE IF EXISTS MovieFacets")
+    cur.execute("CREATE TABLE MovieFacets AS " + facets_select())
+    cur.execute("ALTER TABLE MovieFacets ADD PRIMARY KEY (mid)")
+    for statement in MOVIE_FACET_INDEXES:
+        cur.execute(statement)
+    cur.execute("ANALYZE MovieFacets")
+
+
+def refresh_movies(cur, mids):
+    """
+    Recompute the MovieFacets rows of the given movies, e.g. after new
+    movies, cast or directing rows were inserted. Does nothing if
+    MovieFacets does not exist.
+    """
+    mids = sorted(set(mids))
+    if not mids:
+        return
+    cur.execute("SELECT to_regclass('moviefacets') IS NOT NULL")
+    if not cur.fetchone()[0]:
+        return
+    cur.execute("DELETE FROM MovieFacets WHERE mid = ANY(%(mids)s)", {'mids': mids})
+    cur.execute("INSERT INTO MovieFacets " + facets_select(restrict=True), {'mids': mids})
@@ -0,0 +1,168 @@
+import getpass
+import time
+
+import psycopg2
+
+from telemetry import InstrumentedCursor
+
+# Rank position of every ranked movie within its year, built by the
+# loader. position is 1 for the best-ranked movie of the year (ties share
+# a position); percentile is the fraction of the year's other movies
+# ranked strictly lower (1.0 = sole best, 0.0 = worst).
+MOVIE_RANK_SELECT = """
+    SELECT id AS mid, name, year, rank,
+           RANK() OVER (PARTITION BY year ORDER BY rank DESC) AS position,
+           PERCENT_RANK() OVER (PARTITION BY year ORDER BY rank) AS percentile,
+           COUNT(*) OVER (PARTITION BY year) AS year_count
+    FROM Movie
+    WHERE year IS NOT NULL AND rank IS NOT NULL
+"""
+
+# (year, rank) serves "better than X in the same year" as a backward range
+# scan; name finds X
+MOVIE_RANK_INDEXES = [
+    "CREATE INDEX idx_movierank_year_rank ON MovieRank(year, rank) INCLUDE (mid, name, position, percentile)",
+    "CREATE INDEX idx_movierank_name ON MovieRank(name)",
+]
+
+# X is picked like movie_position does (lowest mid when a name is shared)
+BETTER_THAN_QUERY = """
+    SELECT b.mid, b.name, b.year, b.rank, b.position, b.percentile
+    FROM (
+        SELECT x.year, x.rank
+        FROM MovieRank x
+        WHERE {match}
+        ORDER BY x.mid
+        LIMIT 1
+    ) x
+    JOIN MovieRank b ON b.year = x.year AND b.rank > x.rank
+    ORDER BY b.rank DESC
+    LIMIT %(n)s
+"""
+
+
+def create_movie_ranks(cur):
+    """
+    (Re)build the MovieRank table from Movie.
+    """
+    cur.execute("DROP TABLE IF EXISTS MovieRank")
+    cur.execute(f"""
+        CREATE TABLE MovieRank AS {MOVIE_RANK_SELECT}
+    """)
+    cur.execute("ALTER TABLE MovieRank ADD PRIMARY KEY (mid)")
+    for statement in MOVIE_RANK_INDEXES:
+        cur.execute(statement)
+    cur.execute("ANALYZE MovieRank")
+
+
+def refresh_years(cur, years):
+    """
+    Recompute the MovieRank rows of the given years, e.g. after new movies
+    were inserted. Positions only depend on movies of the same year, so
+    other years are untouched. Does nothing if MovieRank does not exist.
+    """
+    years = sorted(set(y for y in years if y is not None))
+    if not years:
+        return
+    cur.execute("SELECT to_regclass('movierank') IS NOT NULL")
+    if not cur.fetchone()[0]:
+        return
+    cur.execute("DELETE FROM MovieRank WHERE year = ANY(%s)", (years,))
+    cur.execute(f"""
+        INSERT INTO MovieRank
+        SELECT * FROM ({MOVIE_RANK_SELECT}) r
+        WHERE r.year = ANY(%s)
+    """, (years,))
+
+
+def movie_match(movie):
+    """WHERE clause and parameters selecting movie X by id or by name."""
+    if isinstance(movie, int):
+        return "x.mid = %(movie)s", {'movie': movie}
+    return "x.name = %(movie)s", {'movie': movie}
+
+
+def movie_position(cur, movie):
+    """
+    Position of movie (id or name) within its year.
+    Returns (mid, name, year, rank, position, percentile, year_count), or
+    None if the movie is unknown or has no year or rank.
+    """
+    match, params = movie_match(movie)
+    cur.execute(f"""
+        SELECT x.mid, x.name, x.year, x.rank, x.position, x.percentile, x.year_count
+        FROM MovieRank x
+        WHERE {match}
+        ORDER BY x.mid
+        LIMIT 1
+    """, params)
+    return cur.fetchone()
+
+
+def better_than(cur, movie, n=10):
+    """
+    Top n movies of the same year as movie (id or name) with a better
+    rank, best first. Rows are (mid, name, year, rank, position, percentile).
+    If several movies share the name, the one movie_position returns is used.
+    Same answer as query (c) for movie='Shrek (2001)'.
+    """
+    match, params = movie_match(movie)
+    params['n'] = n
+    cur.execute(BETTER_THAN_QUERY.format(match=match), params)
+    return cur.fetchall()
+
+
+def main():
+    """
+    Look up movies' rank positions and the movies that beat them.
+    """
+    print("PostgreSQL Database Connection")
+    db_password = getpass.getpass("Enter PostgreSQL password for user 'postgres': ")
+
+    conn = None
+    try:
+        conn = psycopg2.connect(
+            host="localhost",
+            dbname="moviesdb",
+            user="postgres",
+            password=db_password,
+            cursor_factory=InstrumentedCursor
+        )
+        print("Successfully connected to moviesdb database\n")
+
+        cur = conn.cursor()
+        while True:
+            text = input("\nMovie name or id (blank to quit): ").strip()
+            if not text:
+                break
+            movie = int(text) if text.isdigit() else text
+
+            start = time.perf_counter()
+            position = movie_position(cur, movie)
+            if position is None:
+                print(f"✗ No ranked movie found for {text!r}")
+                continue
+            results = better_than(cur, movie)
+            elapsed = (time.perf_counter() - start) * 1000
+
+            mid, name, year, rank, pos, percentile, year_count = position
+            print(f"{name} ({mid}): #{pos} of {year_count} in {year}, "
+                  f"rank {rank:.2f}, better than {percentile:.1%} of the year")
+            print(f"\n{'ID':<10} {'Name':<50} {'Year':<10} {'Rank':<10} {'Position':<10}")
+            print("-" * 90)
+            for row in results:
+                print(f"{row[0]:<10} {row[1][:48]:<50} {row[2]:<10} {row[3]:<10.2f} {row[4]:<10}")
+            print(f"({len(results)} results in {elapsed:.1f} ms)")
+        cur.close()
+
+    except psycopg2.Error as e:
+        print(f"\nDatabase error: {e}")
+
+    finally:
+        if conn:
+            conn.close()
+        print("\nDatabase connection closed")
+
+
+if __name__ == "__main__":
+    main()
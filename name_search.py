@@ -0,0 +1,226 @@
+import getpass
+import random
+import time
+
+import psycopg2
+
+from telemetry import InstrumentedCursor
+
+# What can be searched: the table, the SQL expression holding the name
+# (indexed below) and the columns returned for each hit
+SEARCH_TARGETS = {
+    'movie': {
+        'table': 'Movie',
+        'name': "name",
+        'columns': "id, name, year, rank",
+        'order': "rank DESC NULLS LAST",
+    },
+    'person': {
+        'table': 'Person',
+        'name': "(fname || ' ' || lname)",
+        'columns': "id, fname, lname, gender",
+        'order': "lname, fname",
+    },
+    'director': {
+        'table': 'Director',
+        'name': "(fname || ' ' || lname)",
+        'columns': "id, fname, lname",
+        'order': "lname, fname",
+    },
+}
+
+# Indexes created by the loader: trigram GIN indexes for fuzzy matching
+# and text_pattern_ops B-trees on the lower-cased name for prefix lookups.
+# {trgm} is the schema pg_trgm is installed in, so the operator class is
+# found whatever the loader's search_path (blue/green builds leave public
+# off it).
+SEARCH_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_movie_name_trgm ON Movie USING gin (name {trgm}.gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_movie_name_prefix ON Movie (lower(name) text_pattern_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_person_name_trgm ON Person USING gin ((fname || ' ' || lname) {trgm}.gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_person_name_prefix ON Person (lower(fname || ' ' || lname) text_pattern_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_person_lname_prefix ON Person (lower(lname) text_pattern_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_director_name_trgm ON Director USING gin ((fname || ' ' || lname) {trgm}.gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_director_name_prefix ON Director (lower(fname || ' ' || lname) text_pattern_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_director_lname_prefix ON Director (lower(lname) text_pattern_ops)",
+]
+
+# Latency targets (milliseconds, 95th percentile) checked by the benchmark
+TARGET_P95_MS = {'search': 20.0, 'autocomplete': 5.0}
+
+
+def trigram_schema(cur):
+    """
+    Schema of the pg_trgm extension, which is created in public if it is
+    not installed yet.
+    """
+    cur.execute("""
+        SELECT n.nspname FROM pg_extension e JOIN pg_namespace n ON n.oid = e.extnamespace
+        WHERE e.extname = 'pg_trgm'
+    """)
+    row = cur.fetchone()
+    if row is not None:
+        return row[0]
+    cur.execute("CREATE EXTENSION pg_trgm SCHEMA public")
+    return 'public'
+
+
+def create_search_indexes(cur):
+    """
+    Create the pg_trgm extension (if needed) and the name search indexes.
+    """
+    schema = trigram_schema(cur)
+    for statement in SEARCH_INDEXES:
+        cur.execute(statement.format(trgm=schema))
+
+
+def escape_like(text):
+    """Escape LIKE wildcards so text is matched literally."""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search(cur, kind, text, limit=10):
+    """
+    Fuzzy search for text in the names of kind ('movie', 'person' or
+    'director'). Handles typos and partial names: a row matches when text
+    is similar to some part of its name (pg_trgm word similarity).
+
+    Returns rows of the target's columns followed by the match score,
+    best matches first.
+    """
+    target = SEARCH_TARGETS[kind]
+    cur.execute(f"""
+        SELECT {target['columns']}, word_similarity(%(text)s, {target['name']}) AS score
+        FROM {target['table']}
+        WHERE %(text)s <%% {target['name']}
+        ORDER BY score DESC, {target['order']}
+        LIMIT %(limit)s
+    """, {'text': text, 'limit': limit})
+    return cur.fetchall()
+
+
+def autocomplete(cur, kind, prefix, limit=10):
+    """
+    Names of kind starting with prefix (case-insensitive). People and
+    directors also match on a last-name prefix. Movies are ordered by rank,
+    people by name.
+    """
+    target = SEARCH_TARGETS[kind]
+    pattern = escape_like(prefix.lower()) + '%'
+    where = f"lower({target['name']}) LIKE %(pattern)s"
+    if kind != 'movie':
+        where += " OR lower(lname) LIKE %(pattern)s"
+    cur.execute(f"""
+        SELECT {target['columns']}
+        FROM {target['table']}
+        WHERE {where}
+        ORDER BY {target['order']}
+        LIMIT %(limit)s
+    """, {'pattern': pattern, 'limit': limit})
+    return cur.fetchall()
+
+
+def add_typo(text, rng):
+    """Copy of text with one character dropped, doubled or swapped."""
+    if len(text) < 4:
+        return text
+    i = rng.randrange(1, len(text) - 2)
+    edit = rng.choice(['drop', 'double', 'swap'])
+    if edit == 'drop':
+        return text[:i] + text[i + 1:]
+    if edit == 'double':
+        return text[:i] + text[i] + text[i:]
+    return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def benchmark(conn, samples=200, seed=482):
+    """
+    Time search() with misspelled names and autocomplete() with 3-6
+    character prefixes, sampled from the data, and compare the 95th
+    percentile latency against TARGET_P95_MS.
+    """
+    rng = random.Random(seed)
+    cur = conn.cursor()
+
+    print(f"{'Kind':<10} {'API':<14} {'p50 (ms)':<10} {'p95 (ms)':<10} {'p99 (ms)':<10} {'Target':<8}")
+    print("-" * 66)
+    for kind, target in SEARCH_TARGETS.items():
+        cur.execute(f"""
+            SELECT {target['name']} FROM {target['table']}
+            TABLESAMPLE SYSTEM (1)
+            WHERE length({target['name']}) >= 6
+            LIMIT %s
+        """, (samples,))
+        names = [row[0] for row in cur.fetchall()]
+        if not names:
+            continue
+
+        for api in ('search', 'autocomplete'):
+            latencies = []
+            for name in names:
+                if api == 'search':
+                    start = time.perf_counter()
+                    search(cur, kind, add_typo(name, rng))
+                else:
+                    prefix = name[:rng.randint(3, 6)]
+                    start = time.perf_counter()
+                    autocomplete(cur, kind, prefix)
+                latencies.append((time.perf_counter() - start) * 1000)
+            p95 = percentile(latencies, 95)
+            met = 'met' if p95 <= TARGET_P95_MS[api] else 'MISSED'
+            print(f"{kind:<10} {api:<14} {percentile(latencies, 50):<10.2f} {p95:<10.2f} "
+                  f"{percentile(latencies, 99):<10.2f} {met:<8}")
+    cur.close()
+
+
+def main():
+    """
+    Benchmark name search, then answer interactive searches.
+    """
+    print("PostgreSQL Database Connection")
+    db_password = getpass.getpass("Enter PostgreSQL password for user 'postgres': ")
+
+    conn = None
+    try:
+        conn = psycopg2.connect(
+            host="localhost",
+            dbname="moviesdb",
+            user="postgres",
+            password=db_password,
+            cursor_factory=InstrumentedCursor
+        )
+        print("Successfully connected to moviesdb database\n")
+
+        benchmark(conn)
+
+        cur = conn.cursor()
+        while True:
+            text = input("\nSearch movies (blank to quit): ").strip()
+            if not text:
+                break
+            start = time.perf_counter()
+            results = search(cur, 'movie', text)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"{'ID':<10} {'Name':<50} {'Year':<10} {'Score':<10}")
+            print("-" * 80)
+            for row in results:
+                print(f"{row[0]:<10} {row[1][:48]:<50} {row[2] or '':<10} {row[4]:<10.2f}")
+            print(f"({len(results)} results in {elapsed:.1f} ms)")
+        cur.close()
+
+    except psycopg2.Error as e:
+        print(f"\nDatabase error: {e}")
+
+    finally:
+        if conn:
+            conn.close()
+        print("\nDatabase connection closed")
+
+
+if __name__ == "__main__":
+    main()
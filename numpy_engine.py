@@ -0,0 +1,294 @@
+import getpass
+import time
+
+import psycopg2
+
+from execute_queries import QUERIES, query_label, write_text_section
+from snapshot import INT32_NULL, load_snapshot, np
+from telemetry import InstrumentedCursor
+
+
+def lookup(sorted_ids, keys):
+    """
+    Sorted-array join: positions of keys in sorted_ids, plus a mask of
+    which keys were found.
+    """
+    if len(sorted_ids) == 0:
+        return np.zeros(len(keys), dtype=np.intp), np.zeros(len(keys), dtype=bool)
+    idx = np.searchsorted(sorted_ids, keys)
+    idx_clipped = np.minimum(idx, len(sorted_ids) - 1)
+    found = (idx < len(sorted_ids)) & (sorted_ids[idx_clipped] == keys)
+    return idx_clipped, found
+
+
+def find_name(column, name):
+    """
+    Row indices of a StringColumn whose value equals name.
+    Only rows with the right byte length are decoded.
+    """
+    target = name.encode('utf-8')
+    lengths = np.diff(column.offsets)
+    matches = []
+    for i in np.flatnonzero(lengths == len(target)):
+        start = int(column.offsets[i])
+        if bytes(column.blob[start:start + len(target)]) == target:
+            matches.append(int(i))
+    return matches
+
+
+def person_rows(person, idx, extra=None):
+    """Build (id, fname, lname[, gender][, extra]) result tuples."""
+    rows = []
+    for n, i in enumerate(idx):
+        row = [int(person['id'][i]), person['fname'][i], person['lname'][i]]
+        if 'gender' in person:
+            row.append(person['gender'][i])
+        if extra is not None:
+            row.append(int(extra[n]))
+        rows.append(tuple(row))
+    return rows
+
+
+def movie_rows(movie, idx, last):
+    """Build (id, name, year, last) result tuples."""
+    rows = []
+    for n, i in enumerate(idx):
+        year = int(movie['year'][i])
+        rows.append((int(movie['id'][i]), movie['name'][i],
+                     None if year == INT32_NULL else year, last[n]))
+    return rows
+
+
+def query_a(t):
+    """Persons who acted both in [1850, 1900) and in [1900, 1950)."""
+    acts, movie, person = t['ActsIn'], t['Movie'], t['Person']
+    midx, found = lookup(movie['id'], acts['mid'])
+    years = np.where(found, movie['year'][midx], INT32_NULL)
+    pids_19th = np.unique(acts['pid'][(years >= 1850) & (years < 1900)])
+    pids_20th = np.unique(acts['pid'][(years >= 1900) & (years < 1950)])
+    both = np.intersect1d(pids_19th, pids_20th, assume_unique=True)
+    pidx, found = lookup(person['id'], both)
+    return person_rows(person, pidx[found])
+
+
+def query_b(t):
+    """Directors who directed a film in a leap year."""
+    directs, movie, director = t['Directs'], t['Movie'], t['Director']
+    midx, found = lookup(movie['id'], directs['mid'])
+    years = movie['year'][midx]
+    leap = (found & (years != INT32_NULL)
+            & (years % 4 == 0) & ((years % 100 != 0) | (years % 400 == 0)))
+    didx, found = lookup(director['id'], np.unique(directs['did'][leap]))
+    return person_rows(director, didx[found])
+
+
+def query_c(t):
+    """Movies from the same year as 'Shrek (2001)' with a better rank."""
+    movie = t['Movie']
+    shrek = find_name(movie['name'], 'Shrek (2001)')
+    if not shrek:
+        return []
+    year, rank = movie['year'][shrek[0]], movie['rank'][shrek[0]]
+    if year == INT32_NULL or np.isnan(rank):
+        return []
+    candidates = np.flatnonzero((movie['year'] == year) & (movie['rank'] > rank))
+    order = candidates[np.argsort(-movie['rank'][candidates], kind='stable')]
+    return movie_rows(movie, order, [float(r) for r in movie['rank'][order]])
+
+
+def query_d(t):
+    """Directors ordered by number of films directed."""
+    directs, director = t['Directs'], t['Director']
+    didx, found = lookup(director['id'], directs['did'])
+    counts = np.bincount(didx[found], minlength=len(director['id']))
+    ranked = np.argsort(-counts, kind='stable')
+    ranked = ranked[counts[ranked] > 0]
+    return person_rows(director, ranked, counts[ranked])
+
+
+def actor_counts(t):
+    """Number of ActsIn rows per Movie row (0 for movies with no cast)."""
+    midx, found = lookup(t['Movie']['id'], t['ActsIn']['mid'])
+    return np.bincount(midx[found], minlength=len(t['Movie']['id']))
+
+
+def query_e_largest(t):
+    """Movies with the largest number of actors, by id."""
+    counts = actor_counts(t)
+    if not counts.any():
+        return []
+    idx = np.flatnonzero(counts == counts.max())
+    return movie_rows(t['Movie'], idx, [int(c) for c in counts[idx]])
+
+
+def query_e_smallest(t):
+    """Movies with the smallest (non-zero) number of actors, by id."""
+    counts = actor_counts(t)
+    if not counts.any():
+        return []
+    idx = np.flatnonzero(counts == counts[counts > 0].min())
+    return movie_rows(t['Movie'], idx, [int(c) for c in counts[idx]])
+
+
+def query_f(t):
+    """Actors who worked with at least 10 distinct directors."""
+    acts, directs, person = t['ActsIn'], t['Directs'], t['Person']
+
+    # Only acting records whose person exists (the join with Person)
+    pidx, found = lookup(person['id'], acts['pid'])
+    act_pidx, act_mid = pidx[found], acts['mid'][found]
+
+    # Directs sorted by mid, so each movie's directors are one contiguous range
+    order = np.argsort(directs['mid'], kind='stable')
+    dir_mid, dir_did = directs['mid'][order], directs['did'][order]
+    lo = np.searchsorted(dir_mid, act_mid, side='left')
+    hi = np.searchsorted(dir_mid, act_mid, side='right')
+    lengths = hi - lo
+
+    # Expand every acting record into one (person, director) pair per director
+    total = int(lengths.sum())
+    starts = np.repeat(lo, lengths)
+    within = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    pair_pidx = np.repeat(act_pidx, lengths).astype(np.int64)
+    pair_did = dir_did[starts + within].astype(np.int64)
+
+    # Distinct (person, director) pairs, then count per person
+    pairs = np.unique((pair_pidx << 32) | (pair_did & 0xFFFFFFFF))
+    counts = np.bincount(pairs >> 32, minlength=len(person['id']))
+
+    ranked = np.argsort(-counts, kind='stable')
+    ranked = ranked[counts[ranked] >= 10]
+    return person_rows({k: person[k] for k in ('id', 'fname', 'lname')}, ranked, counts[ranked])
+
+
+# How each query is computed and how its SQL answer is checked:
+#   'set'    - no ORDER BY: any LIMIT rows of the full answer are valid
+#   'ranked' - ORDER BY the last column: ties at the cut-off may differ
+#   'exact'  - deterministic order: rows must match one for one
+ENGINE_QUERIES = {
+    'a': (query_a, 'set'),
+    'b': (query_b, 'set'),
+    'c': (query_c, 'ranked'),
+    'd': (query_d, 'ranked'),
+    'e_largest': (query_e_largest, 'exact'),
+    'e_smallest': (query_e_smallest, 'exact'),
+    'f': (query_f, 'ranked'),
+}
+
+# LIMIT of each Task 3 query (None for no limit)
+QUERY_LIMITS = {'a': 10, 'b': 10, 'c': 10, 'd': 10, 'e_largest': None, 'e_smallest': 10, 'f': 10}
+
+
+def normalize(row):
+    """Round floats so float32 snapshot values compare equal to REAL values."""
+    return tuple(round(v, 4) if isinstance(v, float) else v for v in row)
+
+
+def check_results(kind, full, sql_rows, limit):
+    """
+    True if sql_rows is a valid answer given the engine's full answer.
+    """
+    expected_count = len(full) if limit is None else min(limit, len(full))
+    if len(sql_rows) != expected_count:
+        return False
+    full_set = {normalize(r) for r in full}
+    sql_norm = [normalize(r) for r in sql_rows]
+    if kind == 'exact':
+        return sql_norm == [normalize(r) for r in full[:expected_count]]
+    if not all(r in full_set for r in sql_norm):
+        return False
+    if kind == 'ranked':
+        # Same sequence of ORDER BY values as the engine's top rows
+        return [r[-1] for r in sql_norm] == [normalize(r)[-1] for r in full[:expected_count]]
+    return True
+
+
+def run_engine(snapshot_dir, output_filename='query_results_numpy.txt'):
+    """
+    Evaluate the Task 3 queries on a snapshot and write them in the
+    query_results.txt format. Returns {name: (full_rows, seconds)}.
+    """
+    start = time.perf_counter()
+    manifest, tables = load_snapshot(snapshot_dir)
+    print(f"Loaded snapshot {snapshot_dir} (load run {manifest['load_run_id']}) "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+    answers = {}
+    with open(output_filename, 'w', encoding='utf-8') as f:
+        for query in QUERIES:
+            print(f"Evaluating query {query_label(query)}...")
+            engine_query, _ = ENGINE_QUERIES[query['name']]
+            start = time.perf_counter()
+            full = engine_query(tables)
+            elapsed = time.perf_counter() - start
+            answers[query['name']] = (full, elapsed)
+
+            limit = QUERY_LIMITS[query['name']]
+            write_text_section(f, query, full if limit is None else full[:limit])
+
+    print(f"\n✓ Results saved to {output_filename}")
+    return answers
+
+
+def cross_check(conn, answers):
+    """
+    Run the SQL version of every query, compare it with the engine's
+    answer and print both timings. Returns True if all queries agree.
+    """
+    cur = conn.cursor()
+    all_ok = True
+
+    print(f"\n{'Query':<16} {'NumPy (ms)':<12} {'Postgres (ms)':<15} {'Match':<6}")
+    print("-" * 50)
+    for query in QUERIES:
+        start = time.perf_counter()
+        cur.execute(query['sql'])
+        sql_rows = cur.fetchall()
+        sql_elapsed = time.perf_counter() - start
+
+        full, engine_elapsed = answers[query['name']]
+        kind = ENGINE_QUERIES[query['name']][1]
+        ok = check_results(kind, full, sql_rows, QUERY_LIMITS[query['name']])
+        all_ok = all_ok and ok
+        print(f"{query_label(query):<16} {engine_elapsed * 1000:<12.1f} "
+              f"{sql_elapsed * 1000:<15.1f} {'yes' if ok else 'NO':<6}")
+
+    cur.close()
+    return all_ok
+
+
+def main():
+    """
+    Evaluate the Task 3 queries offline and cross-check them against PostgreSQL.
+    """
+    snapshot_dir = input("Enter the snapshot directory [moviesdb_snapshot]: ").strip() or 'moviesdb_snapshot'
+    answers = run_engine(snapshot_dir)
+
+    print("\nPostgreSQL Database Connection (for cross-check)")
+    db_password = getpass.getpass("Enter PostgreSQL password for user 'postgres': ")
+
+    conn = None
+    try:
+        conn = psycopg2.connect(
+            host="localhost",
+            dbname="moviesdb",
+            user="postgres",
+            password=db_password,
+            cursor_factory=InstrumentedCursor
+        )
+        if cross_check(conn, answers):
+            print("\n✓ NumPy engine agrees with PostgreSQL on all queries")
+        else:
+            print("\n✗ NumPy engine and PostgreSQL disagree (see table above)")
+
+    except psycopg2.Error as e:
+        print(f"\nDatabase error: {e}")
+
+    finally:
+        if conn:
+            conn.close()
+        print("\nDatabase connection closed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+import array
+import csv
+import io
+import mmap
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Inputs smaller than this are parsed sequentially (pool start-up and
+# result transfer would outweigh the gain)
+PARALLEL_MIN_BYTES = 64 * 1024 * 1024
+
+# Number of byte ranges per worker, so a slow range does not leave the
+# other workers idle at the end
+RANGES_PER_WORKER = 4
+
+# Line appended after a range to check that the range ends at a record
+# boundary (inside an open quoted field it becomes part of that field)
+RANGE_END_SENTINEL = '#moviesdb-range-end#'
+
+# Ranges parsed ahead of the consumer, per worker
+IN_FLIGHT_PER_WORKER = 2
+
+# Window used when counting quote characters and reading lines from the
+# mapped file
+SCAN_WINDOW = 16 * 1024 * 1024
+
+
+def count_quotes(mm, start, end):
+    """Number of '"' bytes in mm[start:end], read in bounded windows."""
+    total = 0
+    while start < end:
+        stop = min(end, start + SCAN_WINDOW)
+        total += mm[start:stop].count(b'"')
+        start = stop
+    return total
+
+
+def split_ranges(mm, n_ranges):
+    """
+    Split a mapped CSV file (after its header line) into about n_ranges
+    byte ranges that each start at the beginning of a line.
+
+    The cuts are candidates only: a newline is taken to end a record when
+    the number of quote characters before it is even (an escaped "" adds
+    two, so it does not change the parity). A quote inside an unquoted
+    field (He said "hi) is a literal for csv.reader but still flips the
+    parity, so parse_cast_range checks every cut it reaches.
+    """
+    size = len(mm)
+    header_end = mm.find(b'\n')
+    if header_end < 0:
+        return []
+    data_start = header_end + 1
+    quotes = count_quotes(mm, 0, data_start)
+
+    boundaries = [data_start]
+    pos = data_start
+    for i in range(1, n_ranges):
+        target = data_start + (size - data_start) * i // n_ranges
+        if target <= pos:
+            continue
+        quotes += count_quotes(mm, pos, target)
+        pos = target
+        while True:
+            newline = mm.find(b'\n', pos)
+            if newline < 0:
+                pos = size
+                break
+            quotes += count_quotes(mm, pos, newline)
+            pos = newline + 1
+            if quotes % 2 == 0:
+                break
+        if pos >= size:
+            break
+        boundaries.append(pos)
+    boundaries.append(size)
+
+    return [(a, b) for a, b in zip(boundaries, boundaries[1:]) if b > a]
+
+
+class LineReader:
+    """
+    Lines of a mapped file (or bytes) from a byte offset, decoded and with '\r\n' and
+    '\r' line endings turned into '\n' (like open() in text mode).
+    .pos is the byte offset after the last line handed out, so once
+    csv.reader yields a record, .pos is where that record ends.
+    """
+
+    def __init__(self, mm, start):
+        self.mm = mm
+        self.pos = start
+        self.block_end = start
+        self.lines = iter(())
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = next(self.lines, None)
+        if line is None:
+            self.read_block()
+            line = next(self.lines)  # StopIteration at end of file
+        self.pos += len(line)
+        if line.endswith(b'\r\n'):
+            line = line[:-2] + b'\n'
+        elif line.endswith(b'\r'):
+            line = line[:-1] + b'\n'
+        return line.decode('latin-1')
+
+    def read_block(self):
+        start = self.block_end
+        if start >= len(self.mm):
+            raise StopIteration
+        end = min(len(self.mm), start + SCAN_WINDOW)
+        # Finish the block at a line end ('\n' also completes '\r\n')
+        newline = self.mm.find(b'\n', end)
+        end = len(self.mm) if newline < 0 else newline + 1
+        self.block_end = end
+        self.lines = iter(self.mm[start:end].splitlines(keepends=True))
+
+
+def convert_rows(reader, pids, mids, roles):
+    """
+    Convert csv rows the way the sequential loader does, appending the
+    valid ones to pids/mids/roles. After each row, yields the raw row and
+    the number of rows that failed conversion so far.
+    """
+    invalid = 0
+    for row in reader:
+        if len(row) >= 2:  # Only need pid and mid
+            try:
+                pid = int(row[0])
+                mid = int(row[1])
+            except ValueError:
+                invalid += 1
+            else:
+                pids.append(pid)
+                mids.append(mid)
+                roles.append(row[2] if len(row) > 2 else '')
+        yield row, invalid
+
+
+def parse_cast_range(path, start, end, cuts):
+    """
+    Parse and convert IMDBCast.txt rows from byte start the same way the
+    sequential loader does. Runs in a worker process.
+
+    start must be a record boundary for the result to be used. The bytes
+    up to end are parsed in one go, followed by a sentinel line: it comes
+    back as a record of its own only if end is a record boundary. If it is
+    not (the cut fell inside a quoted field), the range is parsed again
+    line by line, running on past end to the first cut (one of cuts: the
+    candidate range starts plus the file size) where a record ends.
+
+    Returns (pids, mids, roles, invalid, stop): typed columns of the valid
+    rows in file order, the number of rows that failed conversion, and
+    the byte offset where parsing stopped (a true record boundary).
+    """
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            at_eof = end >= len(mm)
+            text = mm[start:end].decode('latin-1')
+            if not at_eof:
+                text += RANGE_END_SENTINEL + '\n'
+
+            # newline=None matches the universal-newline text mode of open()
+            pids, mids, roles = array.array('q'), array.array('q'), []
+            last, invalid = None, 0
+            for last, invalid in convert_rows(csv.reader(io.StringIO(text, newline=None)),
+                                              pids, mids, roles):
+                pass
+            if at_eof or last == [RANGE_END_SENTINEL]:
+                return pids, mids, roles, invalid, end
+
+            cuts = set(cuts)
+            pids, mids, roles = array.array('q'), array.array('q'), []
+            invalid = 0
+            lines = LineReader(mm, start)
+            for _, invalid in convert_rows(csv.reader(lines), pids, mids, roles):
+                if lines.pos >= end and lines.pos in cuts:
+                    break
+            return pids, mids, roles, invalid, lines.pos
+
+
+def iter_cast_rows(path, workers, counts):
+    """
+    Parse IMDBCast.txt with a pool of worker processes and yield
+    (pid, mid, role) tuples in file order, exactly like the sequential
+    parse. counts['invalid'] is increased by the number of rows that
+    failed conversion.
+
+    Ranges are used in order, starting where the previous one really
+    stopped. A range whose start was a wrong cut is covered by the range
+    before it (which ran on past the cut) and its result is discarded.
+    At most IN_FLIGHT_PER_WORKER ranges per worker are parsed ahead of
+    the consumer, which bounds the rows held in memory.
+    """
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            ranges = split_ranges(mm, workers * RANGES_PER_WORKER)
+    if not ranges:
+        return
+    cuts = [start for start, _ in ranges] + [ranges[-1][1]]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        todo = iter(ranges)
+
+        def submit_next():
+            for start, end in todo:
+                in_flight.append((start, pool.submit(parse_cast_range, path, start, end, cuts)))
+                return
+
+        for _ in range(workers * IN_FLIGHT_PER_WORKER):
+            submit_next()
+
+        position = ranges[0][0]
+        while in_flight:
+            start, future = in_flight.popleft()
+            submit_next()
+            if start < position:
+                continue  # already parsed by an earlier range
+            pids, mids, roles, invalid, position = future.result()
+            counts['invalid'] = counts.get('invalid', 0) + invalid
+            yield from zip(pids, mids, roles)
+
+
+def use_parallel_parse(path, workers):
+    """
+    True if path should be parsed with iter_cast_rows: a plain (mappable)
+    file large enough to benefit, and more than one worker available.
+    """
+    return (workers is not None and workers > 1
+            and path.endswith('.txt') and os.path.exists(path)
+            and os.path.getsize(path) >= PARALLEL_MIN_BYTES)
+
+
+def sequential_cast_rows(path):
+    """
+    Reference sequential parse: (pid, mid, role) rows and invalid count.
+    """
+    rows = []
+    invalid = 0
+    with open(path, 'r', encoding='latin-1') as f:
+        reader = csv.reader(f)
+        next(reader)  # Skip header
+        for row in reader:
+            if len(row) >= 2:
+                try:
+                    rows.append((int(row[0]), int(row[1]), row[2] if len(row) > 2 else ''))
+                except ValueError:
+                    invalid += 1
+    return rows, invalid
+
+
+def main():
+    """
+    Time the parse of IMDBCast.txt at 1..N workers against the sequential
+    parse and check that every run produces identical rows.
+    """
+    data_dir = input("Enter the path to the directory containing IMDB .txt files: ").strip()
+    path = os.path.join(data_dir, "IMDBCast.txt")
+    if not os.path.exists(path):
+        print(f"✗ File not found: {path}")
+        return
+
+    start = time.perf_counter()
+    expected, expected_invalid = sequential_cast_rows(path)
+    baseline = time.perf_counter() - start
+    print(f"Sequential parse: {len(expected)} rows in {baseline:.2f} s\n")
+
+    print(f"{'Workers':<10} {'Seconds':<10} {'Speedup':<10} {'Identical':<10}")
+    print("-" * 40)
+    worker_counts = [1, 2, 4, 8, 16, 32]
+    max_workers = os.cpu_count() or 1
+    for workers in [w for w in worker_counts if w < max_workers] + [max_workers]:
+        counts = {}
+        start = time.perf_counter()
+        rows = list(iter_cast_rows(path, workers, counts))
+        elapsed = time.perf_counter() - start
+        identical = rows == expected and counts.get('invalid', 0) == expected_invalid
+        print(f"{workers:<10} {elapsed:<10.2f} {baseline / elapsed:<10.2f} {'yes' if identical else 'NO':<10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+import csv
+import json
+import os
+import time
+
+# pyarrow is only needed for the columnar formats (arrow, parquet)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Number of rows pulled from the cursor per fetchmany() call
+FETCH_BATCH_SIZE = 50000
+
+# File extension used for each output format
+FORMAT_EXTENSIONS = {
+    'csv': '.csv',
+    'jsonl': '.jsonl',
+    'arrow': '.arrow',
+    'parquet': '.parquet',
+}
+
+# PostgreSQL type OIDs (from cursor.description) that we map to Arrow types
+PG_INT_OIDS = {20, 21, 23}       # int8, int2, int4
+PG_FLOAT_OIDS = {700, 701, 1700}  # float4, float8, numeric
+
+
+def check_format(output_format):
+    """
+    Raise ValueError if output_format is unknown or its library is missing.
+    """
+    if output_format not in FORMAT_EXTENSIONS:
+        raise ValueError(
+            f"Unknown output format '{output_format}' "
+            f"(choose from {', '.join(FORMAT_EXTENSIONS)})"
+        )
+    if output_format in ('arrow', 'parquet') and pa is None:
+        raise ValueError(
+            f"The '{output_format}' format needs pyarrow (pip install pyarrow)"
+        )
+
+
+def fetch_batches(cur, batch_size=FETCH_BATCH_SIZE):
+    """
+    Yield lists of rows from an executed cursor, batch_size rows at a time.
+    """
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            break
+        yield rows
+
+
+class CsvResultWriter:
+    """Semicolon-delimited CSV, same layout as best_movies_1995_2004.csv."""
+
+    def __init__(self, path, columns, type_codes):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file, delimiter=';', lineterminator='\n')
+        self.writer.writerow(columns)
+
+    def write_batch(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class JsonlResultWriter:
+    """One JSON object per line, keyed by column name."""
+
+    def __init__(self, path, columns, type_codes):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.columns = columns
+
+    def write_batch(self, rows):
+        self.file.writelines(
+            json.dumps(dict(zip(self.columns, row)), ensure_ascii=False) + '\n'
+            for row in rows
+        )
+
+    def close(self):
+        self.file.close()
+
+
+class ArrowResultWriter:
+    """Arrow IPC file; readers can memory-map it without copying."""
+
+    def __init__(self, path, columns, type_codes):
+        self.schema = arrow_schema(columns, type_codes)
+        self.sink = pa.OSFile(path, 'wb')
+        self.writer = pa.ipc.new_file(self.sink, self.schema)
+
+    def write_batch(self, rows):
+        self.writer.write_batch(rows_to_record_batch(rows, self.schema))
+
+    def close(self):
+        self.writer.close()
+        self.sink.close()
+
+
+class ParquetResultWriter:
+    """Parquet file with one row group per fetched batch."""
+
+    def __init__(self, path, columns, type_codes):
+        self.schema = arrow_schema(columns, type_codes)
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write_batch(self, rows):
+        self.writer.write_batch(rows_to_record_batch(rows, self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {
+    'csv': CsvResultWriter,
+    'jsonl': JsonlResultWriter,
+    'arrow': ArrowResultWriter,
+    'parquet': ParquetResultWriter,
+}
+
+
+def arrow_schema(columns, type_codes):
+    """
+    Build an Arrow schema from column names and PostgreSQL type OIDs.
+    """
+    fields = []
+    for name, oid in zip(columns, type_codes):
+        if oid in PG_INT_OIDS:
+            fields.append(pa.field(name, pa.int64()))
+        elif oid in PG_FLOAT_OIDS:
+            fields.append(pa.field(name, pa.float64()))
+        else:
+            fields.append(pa.field(name, pa.string()))
+    return pa.schema(fields)
+
+
+def rows_to_record_batch(rows, schema):
+    """
+    Transpose a list of row tuples into an Arrow RecordBatch.
+    """
+    arrays = [
+        pa.array([row[i] for row in rows], type=field.type)
+        for i, field in enumerate(schema)
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def export_cursor(cur, output_format, path, batch_size=FETCH_BATCH_SIZE, first_rows=0):
+    """
+    Write the result of an executed cursor to path in output_format.
+
+    Rows are fetched batch_size at a time, so only one batch is held in
+    memory. Returns (row_count, preview) where preview holds up to
+    first_rows rows from the start of the result.
+    """
+    check_format(output_format)
+    columns = [desc[0] for desc in cur.description]
+    type_codes = [desc[1] for desc in cur.description]
+
+    writer = WRITERS[output_format](path, columns, type_codes)
+    row_count = 0
+    preview = []
+    try:
+        for rows in fetch_batches(cur, batch_size):
+            writer.write_batch(rows)
+            if len(preview) < first_rows:
+                preview.extend(rows[:first_rows - len(preview)])
+            row_count += len(rows)
+    finally:
+        writer.close()
+
+    return row_count, preview
+
+
+def compare_formats(conn, query, params, basename, batch_size=FETCH_BATCH_SIZE):
+    """
+    Export the same query in every available format and print the
+    write time and file size of each.
+    """
+    formats = [fmt for fmt in FORMAT_EXTENSIONS
+               if fmt not in ('arrow', 'parquet') or pa is not None]
+    if pa is None:
+        print("(pyarrow not installed: skipping arrow and parquet)")
+
+    print(f"{'Format':<10} {'Rows':<12} {'Seconds':<10} {'Size (KB)':<12}")
+    print("-" * 50)
+    for fmt in formats:
+        path = basename + FORMAT_EXTENSIONS[fmt]
+        # Named (server-side) cursor so large results are not fetched at once
+        cur = conn.cursor(name=f"compare_{fmt}")
+        cur.itersize = batch_size
+        try:
+            start = time.perf_counter()
+            cur.execute(query, params)
+            row_count, _ = export_cursor(cur, fmt, path, batch_size)
+            elapsed = time.perf_counter() - start
+        finally:
+            cur.close()
+        conn.commit()
+        size_kb = os.path.getsize(path) / 1024
+        print(f"{fmt:<10} {row_count:<12} {elapsed:<10.3f} {size_kb:<12.1f}")
+
+
+def main():
+    """
+    Compare output formats on the Task 4 query over the whole movie table.
+    """
+    import getpass
+    import psycopg2
+    from task4 import QUERY
+    from telemetry import InstrumentedCursor
+
+    print("PostgreSQL Database Connection")
+    db_password = getpass.getpass("Enter PostgreSQL password for user 'postgres': ")
+
+    conn = None
+    try:
+        conn = psycopg2.connect(
+            host="localhost",
+            dbname="moviesdb",
+            user="postgres",
+            password=db_password,
+            cursor_factory=InstrumentedCursor
+        )
+        print("Successfully connected to moviesdb database\n")
+
+        print("Comparing output formats for all ranked movies (1800-2100)...")
+        compare_formats(conn, QUERY, (1800, 2100, 10000000), 'format_comparison')
+
+    except psycopg2.Error as e:
+        print(f"\nDatabase error: {e}")
+
+    finally:
+        if conn:
+            conn.close()
+        print("\nDatabase connection closed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+import getpass
+import heapq
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+
+from execute_queries import QUERIES, query_label, write_text_section
+from telemetry import InstrumentedCursor
+
+# Shard instances (one PostgreSQL server per shard). Edit to match the
+# local setup; benchmark_scaling uses the first 1, 2 and 4 of them.
+SHARDS = [
+    {'host': 'localhost', 'port': 5433, 'dbname': 'moviesdb'},
+    {'host': 'localhost', 'port': 5434, 'dbname': 'moviesdb'},
+    {'host': 'localhost', 'port': 5435, 'dbname': 'moviesdb'},
+    {'host': 'localhost', 'port': 5436, 'dbname': 'moviesdb'},
+]
+
+# Tables copied in full to every shard
+REPLICATED_TABLES = {
+    'Movie': "id INTEGER PRIMARY KEY, name TEXT, year INTEGER, rank REAL",
+    'Person': "id INTEGER PRIMARY KEY, fname TEXT, lname TEXT, gender TEXT",
+    'Director': "id INTEGER PRIMARY KEY, fname TEXT, lname TEXT",
+}
+
+# Tables split across shards by mid. A movie, its cast and its directors
+# all live on shard (mid % n_shards), so per-movie joins stay local.
+PARTITIONED_TABLES = {
+    'ActsIn': ("pid INTEGER, mid INTEGER, role TEXT, PRIMARY KEY (pid, mid)", "pid, mid, role"),
+    'Directs': ("did INTEGER, mid INTEGER, PRIMARY KEY (did, mid)", "did, mid"),
+}
+
+SHARD_INDEXES = [
+    "CREATE INDEX idx_actsin_pid ON ActsIn(pid)",
+    "CREATE INDEX idx_actsin_mid ON ActsIn(mid)",
+    "CREATE INDEX idx_directs_did ON Directs(did)",
+    "CREATE INDEX idx_directs_mid ON Directs(mid)",
+]
+
+
+def connect_shards(shards, db_password):
+    """
+    Open one connection per shard.
+    """
+    return [
+        psycopg2.connect(user="postgres", password=db_password,
+                         cursor_factory=InstrumentedCursor, **shard)
+        for shard in shards
+    ]
+
+
+def copy_between(src_conn, src_sql, dst_conn, dst_table):
+    """
+    Stream the result of src_sql into dst_table with COPY, through an OS
+    pipe, so rows are never buffered in full on the coordinator.
+    """
+    read_fd, write_fd = os.pipe()
+    errors = []
+
+    def produce():
+        try:
+            with os.fdopen(write_fd, 'wb') as writer:
+                src_conn.cursor().copy_expert(f"COPY ({src_sql}) TO STDOUT", writer)
+        except Exception as e:
+            errors.append(e)
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    with os.fdopen(read_fd, 'rb') as reader:
+        dst_conn.cursor().copy_expert(f"COPY {dst_table} FROM STDIN", reader)
+    producer.join()
+    if errors:
+        raise errors[0]
+
+
+def load_shards(primary_conn, shard_conns):
+    """
+    Distribute the tables loaded into the primary database (by
+    COS482_HW2.py, which already validated, de-duplicated and removed
+    rows with invalid foreign keys) across the shard databases.
+    """
+    n_shards = len(shard_conns)
+    for shard_index, conn in enumerate(shard_conns):
+        print(f"\nLoading shard {shard_index + 1} of {n_shards}...")
+        cur = conn.cursor()
+        for table in list(PARTITIONED_TABLES) + list(REPLICATED_TABLES):
+            cur.execute(f"DROP TABLE IF EXISTS {table} CASCADE")
+        for table, columns in REPLICATED_TABLES.items():
+            cur.execute(f"CREATE TABLE {table}({columns})")
+        for table, (columns, _) in PARTITIONED_TABLES.items():
+            cur.execute(f"CREATE TABLE {table}({columns})")
+        conn.commit()
+
+        for table in REPLICATED_TABLES:
+            copy_between(primary_conn, f"SELECT * FROM {table}", conn, table)
+            print(f"  ✓ {table} replicated")
+
+        for table, (_, column_list) in PARTITIONED_TABLES.items():
+            copy_between(
+                primary_conn,
+                f"SELECT {column_list} FROM {table} WHERE mid % {n_shards} = {shard_index}",
+                conn, table
+            )
+            print(f"  ✓ {table} partition {shard_index} loaded")
+
+        for statement in SHARD_INDEXES:
+            cur.execute(statement)
+        cur.execute("ANALYZE")
+        conn.commit()
+        cur.close()
+        primary_conn.commit()
+
+
+class ShardCoordinator:
+    """
+    Runs the Task 3 queries and the Task 4 top-k query across shards:
+    each query is sent to every shard in parallel (scatter), then the
+    partial results are combined on the coordinator (gather).
+    """
+
+    def __init__(self, shard_conns):
+        self.conns = shard_conns
+        self.n_shards = len(shard_conns)
+        self.pool = ThreadPoolExecutor(max_workers=self.n_shards)
+
+    def close(self):
+        self.pool.shutdown()
+
+    def scatter(self, sql, params=None):
+        """
+        Run sql on every shard in parallel and return one row list per shard.
+        params may be a dict; 'shard' and 'n_shards' are filled in per shard.
+        """
+        def run(shard_index):
+            conn = self.conns[shard_index]
+            shard_params = dict(params or {}, shard=shard_index, n_shards=self.n_shards)
+            cur = conn.cursor()
+            try:
+                cur.execute(sql, shard_params)
+                return cur.fetchall()
+            finally:
+                cur.close()
+                conn.commit()
+
+        return list(self.pool.map(run, range(self.n_shards)))
+
+    def fetch_one_shard(self, sql, params=None):
+        """
+        Run sql against replicated tables on the first shard.
+        """
+        cur = self.conns[0].cursor()
+        try:
+            cur.execute(sql, params)
+            return cur.fetchall()
+        finally:
+            cur.close()
+            self.conns[0].commit()
+
+    def query_a(self):
+        # A person's 19th- and 20th-century movies can be on different
+        # shards, so each shard reports which half each actor appears in
+        partials = self.scatter("""
+            SELECT DISTINCT a.pid, m.year < 1900
+            FROM ActsIn a
+            JOIN Movie m ON a.mid = m.id
+            WHERE m.year >= 1850 AND m.year < 1950
+        """)
+        early, late = set(), set()
+        for rows in partials:
+            for pid, is_early in rows:
+                (early if is_early else late).add(pid)
+        both = sorted(early & late)
+        if not both:
+            return []
+        return self.fetch_one_shard("""
+            SELECT id, fname, lname, gender
+            FROM Person
+            WHERE id = ANY(%s)
+            ORDER BY id
+            LIMIT 10
+        """, (both,))
+
+    def query_b(self):
+        # Any 10 qualifying directors will do, so each shard stops at 10
+        partials = self.scatter("""
+            SELECT DISTINCT d.id, d.fname, d.lname
+            FROM Director d
+            JOIN Directs dr ON d.id = dr.did
+            JOIN Movie m ON dr.mid = m.id
+            WHERE m.year IS NOT NULL
+              AND (m.year %% 4 = 0 AND (m.year %% 100 != 0 OR m.year %% 400 = 0))
+            LIMIT 10
+        """)
+        seen = {}
+        for rows in partials:
+            for row in rows:
+                seen.setdefault(row[0], row)
+        return list(seen.values())[:10]
+
+    def query_c(self):
+        # Movie is replicated; each shard ranks only the movies it owns
+        partials = self.scatter("""
+            SELECT m.id, m.name, m.year, m.rank
+            FROM Movie m
+            WHERE m.year = (SELECT year FROM Movie WHERE name = 'Shrek (2001)')
+              AND m.rank > (SELECT rank FROM Movie WHERE name = 'Shrek (2001)')
+              AND m.id %% %(n_shards)s = %(shard)s
+            ORDER BY m.rank DESC
+            LIMIT 10
+        """)
+        return merge_top_k(partials, key=lambda row: row[3], k=10)
+
+    def query_d(self):
+        # A director's films are spread over shards: sum partial counts
+        partials = self.scatter("""
+            SELECT dr.did, COUNT(dr.mid)
+            FROM Directs dr
+            JOIN Director d ON d.id = dr.did
+            GROUP BY dr.did
+        """)
+        counts = Counter()
+        for rows in partials:
+            for did, count in rows:
+                counts[did] += count
+        top = counts.most_common(10)
+        names = {row[0]: row for row in self.fetch_one_shard(
+            "SELECT id, fname, lname FROM Director WHERE id = ANY(%s)",
+            ([did for did, _ in top],)
+        )}
+        return [names[did] + (count,) for did, count in top]
+
+    def query_e(self, largest):
+        # A movie's whole cast is on one shard, so per-shard counts are final
+        aggregate = 'MAX' if largest else 'MIN'
+        partials = self.scatter(f"""
+            WITH ActorCounts AS (
+                SELECT m.id, m.name, m.year, COUNT(a.pid) AS num_actors
+                FROM Movie m
+                JOIN ActsIn a ON m.id = a.mid
+                GROUP BY m.id, m.name, m.year
+            )
+            SELECT id, name, year, num_actors
+            FROM ActorCounts
+            WHERE num_actors = (SELECT {aggregate}(num_actors) FROM ActorCounts)
+            ORDER BY id
+            {'' if largest else 'LIMIT 10'}
+        """)
+        rows = [row for shard_rows in partials for row in shard_rows]
+        if not rows:
+            return []
+        best = (max if largest else min)(row[3] for row in rows)
+        rows = sorted((row for row in rows if row[3] == best), key=lambda row: row[0])
+        return rows if largest else rows[:10]
+
+    def query_f(self):
+        # Distinct director counts are not additive across shards. Each
+        # shard's count is a lower bound and their sum an upper bound; only
+        # actors whose upper bound reaches the 10th best lower bound (and 10)
+        # are counted exactly from their (pid, did) pairs.
+        partials = self.scatter("""
+            SELECT a.pid, COUNT(DISTINCT dr.did)
+            FROM ActsIn a
+            JOIN Person p ON p.id = a.pid
+            JOIN Directs dr ON a.mid = dr.mid
+            GROUP BY a.pid
+        """)
+        upper, lower = Counter(), Counter()
+        for rows in partials:
+            for pid, count in rows:
+                upper[pid] += count
+                lower[pid] = max(lower[pid], count)
+
+        lower_bounds = heapq.nlargest(10, lower.values())
+        threshold = max(10, lower_bounds[-1] if len(lower_bounds) == 10 else 0)
+        candidates = [pid for pid, count in upper.items() if count >= threshold]
+        if not candidates:
+            return []
+
+        pairs = self.scatter("""
+            SELECT DISTINCT a.pid, dr.did
+            FROM ActsIn a
+            JOIN Directs dr ON a.mid = dr.mid
+            WHERE a.pid = ANY(%(candidates)s)
+        """, {'candidates': candidates})
+        directors = {}
+        for rows in pairs:
+            for pid, did in rows:
+                directors.setdefault(pid, set()).add(did)
+        exact = sorted(
+            ((pid, len(dids)) for pid, dids in directors.items() if len(dids) >= 10),
+            key=lambda item: -item[1]
+        )[:10]
+
+        names = {row[0]: row for row in self.fetch_one_shard(
+            "SELECT id, fname, lname FROM Person WHERE id = ANY(%s)",
+            ([pid for pid, _ in exact],)
+        )}
+        return [names[pid] + (count,) for pid, count in exact]
+
+    def run_query(self, name):
+        """
+        Run one Task 3 query by its QUERIES name.
+        """
+        if name == 'e_largest':
+            return self.query_e(largest=True)
+        if name == 'e_smallest':
+            return self.query_e(largest=False)
+        return getattr(self, f"query_{name}")()
+
+    def find_best_movies_in_years(self, start_year, end_year, k):
+        """
+        Top-k movies in a year range: each shard returns the top k of the
+        movies it owns and the coordinator merges them.
+        """
+        partials = self.scatter("""
+            SELECT id, name, year, rank
+            FROM Movie
+            WHERE year >= %(start_year)s AND year <= %(end_year)s
+              AND rank IS NOT NULL
+              AND rank >= 0 AND rank <= 10
+              AND id %% %(n_shards)s = %(shard)s
+            ORDER BY rank DESC
+            LIMIT %(k)s
+        """, {'start_year': start_year, 'end_year': end_year, 'k': k})
+        return merge_top_k(partials, key=lambda row: row[3], k=k)
+
+
+def merge_top_k(partials, key, k):
+    """
+    Merge per-shard lists that are each sorted by key descending.
+    """
+    return list(heapq.merge(*partials, key=key, reverse=True))[:k]
+
+
+def execute_queries_sharded(coordinator, output_filename='query_results_sharded.txt'):
+    """
+    Run all Task 3 queries through the coordinator and write them in the
+    query_results.txt format. Returns {name: seconds}.
+    """
+    timings = {}
+    with open(output_filename, 'w', encoding='utf-8') as f:
+        for query in QUERIES:
+            print(f"Executing query {query_label(query)} on {coordinator.n_shards} shard(s)...")
+            start = time.perf_counter()
+            results = coordinator.run_query(query['name'])
+            timings[query['name']] = time.perf_counter() - start
+            write_text_section(f, query, results)
+    print(f"✓ Results saved to {output_filename}")
+    return timings
+
+
+def benchmark_scaling(primary_conn, db_password, shard_counts=(1, 2, 4)):
+    """
+    Load and query the data at each shard count and print the timings.
+    """
+    timings = {}
+    for n_shards in shard_counts:
+        if n_shards > len(SHARDS):
+            print(f"(Skipping {n_shards} shards: only {len(SHARDS)} configured)")
+            continue
+        shard_conns = connect_shards(SHARDS[:n_shards], db_password)
+        try:
+            start = time.perf_counter()
+            load_shards(primary_conn, shard_conns)
+            load_time = time.perf_counter() - start
+
+            coordinator = ShardCoordinator(shard_conns)
+            timings[n_shards] = execute_queries_sharded(
+                coordinator, f"query_results_sharded_{n_shards}.txt"
+            )
+            timings[n_shards]['load'] = load_time
+            start = time.perf_counter()
+            coordinator.find_best_movies_in_years(1995, 2004, 20)
+            timings[n_shards]['top_k'] = time.perf_counter() - start
+            coordinator.close()
+        finally:
+            for conn in shard_conns:
+                conn.close()
+
+    columns = list(timings)
+    print("\n" + "=" * 60)
+    print("Seconds per step by number of shards")
+    print("=" * 60)
+    print(f"{'Step':<16}" + "".join(f"{f'{n} shard(s)':<14}" for n in columns))
+    for step in ['load'] + [q['name'] for q in QUERIES] + ['top_k']:
+        print(f"{step:<16}" + "".join(f"{timings[n][step]:<14.3f}" for n in columns))
+
+
+def main():
+    """
+    Distribute moviesdb across the configured shards and benchmark it.
+    """
+    print("PostgreSQL Database Connection")
+    db_password = getpass.getpass("Enter PostgreSQL password for user 'postgres': ")
+
+    primary_conn = None
+    try:
+        primary_conn = psycopg2.connect(
+            host="localhost",
+            dbname="moviesdb",
+            user="postgres",
+            password=db_password,
+            cursor_factory=InstrumentedCursor
+        )
+        print("Successfully connected to moviesdb database\n")
+        benchmark_scaling(primary_conn, db_password)
+
+    except psycopg2.Error as e:
+        print(f"\nDatabase error: {e}")
+
+    finally:
+        if primary_conn:
+            primary_conn.close()
+        print("\nDatabase connection closed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+import array
+import datetime
+import getpass
+import json
+import os
+import shutil
+import sys
+import time
+
+import psycopg2
+
+from telemetry import InstrumentedCursor
+
+# numpy is only needed to load a snapshot (numpy.memmap), not to write one
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Bump when the on-disk layout changes
+SNAPSHOT_FORMAT_VERSION = 1
+
+# Rows fetched per round trip while exporting
+SNAPSHOT_BATCH_SIZE = 50000
+
+# Columns of each table and their on-disk type. Rows are written in
+# primary key order so the id columns are sorted and can be searched
+# or merge-joined directly.
+SNAPSHOT_TABLES = {
+    'Movie': {
+        'columns': [('id', 'int32'), ('name', 'str'), ('year', 'int32'), ('rank', 'float32')],
+        'order_by': ['id'],
+    },
+    'Person': {
+        'columns': [('id', 'int32'), ('fname', 'str'), ('lname', 'str'), ('gender', 'str')],
+        'order_by': ['id'],
+    },
+    'Director': {
+        'columns': [('id', 'int32'), ('fname', 'str'), ('lname', 'str')],
+        'order_by': ['id'],
+    },
+    'ActsIn': {
+        'columns': [('pid', 'int32'), ('mid', 'int32'), ('role', 'str')],
+        'order_by': ['pid', 'mid'],
+    },
+    'Directs': {
+        'columns': [('did', 'int32'), ('mid', 'int32')],
+        'order_by': ['did', 'mid'],
+    },
+}
+
+# NULL integers are stored as this sentinel, NULL floats as NaN.
+# NULL strings are stored as empty strings.
+INT32_NULL = -2147483648
+
+# array module typecodes for the fixed-width column types
+ARRAY_TYPECODES = {'int32': 'i', 'float32': 'f', 'int64': 'q'}
+
+
+def get_load_run(cur):
+    """
+    Return (run_id, loaded_at) of the load the database currently holds,
+    or (None, None) if the LoadInfo table is missing or empty.
+    """
+    cur.execute("SELECT to_regclass('loadinfo')")
+    if cur.fetchone()[0] is None:
+        return None, None
+    cur.execute("SELECT run_id, loaded_at FROM LoadInfo ORDER BY loaded_at DESC LIMIT 1")
+    row = cur.fetchone()
+    if row is None:
+        return None, None
+    return row[0], row[1].isoformat() if row[1] else None
+
+
+def export_table(conn, table, spec, table_dir):
+    """
+    Write one table to table_dir, one file per column (two per string
+    column), and return the table's manifest entry.
+    """
+    columns = spec['columns']
+    files = {}
+    string_offsets = {}
+    manifest_columns = {}
+
+    for name, col_type in columns:
+        if col_type == 'str':
+            files[name] = (
+                open(os.path.join(table_dir, f"{name}.offsets"), 'wb'),
+                open(os.path.join(table_dir, f"{name}.blob"), 'wb'),
+            )
+            # Offsets have one more entry than there are rows; start at 0
+            array.array('q', [0]).tofile(files[name][0])
+            string_offsets[name] = 0
+            manifest_columns[name] = {
+                'type': 'str',
+                'offsets': f"{name}.offsets",
+                'offsets_dtype': 'int64',
+                'blob': f"{name}.blob",
+                'encoding': 'utf-8',
+            }
+        else:
+            files[name] = open(os.path.join(table_dir, f"{name}.bin"), 'wb')
+            manifest_columns[name] = {
+                'type': col_type,
+                'data': f"{name}.bin",
+                'null': 'NaN' if col_type.startswith('float') else INT32_NULL,
+            }
+
+    # Server-side cursor so the table is never fetched all at once
+    cur = conn.cursor(name=f"snapshot_{table.lower()}")
+    cur.itersize = SNAPSHOT_BATCH_SIZE
+    cur.execute(
+        f"SELECT {', '.join(name for name, _ in columns)} FROM {table} "
+        f"ORDER BY {', '.join(spec['order_by'])}"
+    )
+
+    row_count = 0
+    try:
+        while True:
+            rows = cur.fetchmany(SNAPSHOT_BATCH_SIZE)
+            if not rows:
+                break
+            row_count += len(rows)
+
+            for i, (name, col_type) in enumerate(columns):
+                values = [row[i] for row in rows]
+                if col_type == 'str':
+                    offsets_file, blob_file = files[name]
+                    offsets = array.array('q')
+                    end = string_offsets[name]
+                    for value in values:
+                        encoded = (value or '').encode('utf-8')
+                        blob_file.write(encoded)
+                        end += len(encoded)
+                        offsets.append(end)
+                    offsets.tofile(offsets_file)
+                    string_offsets[name] = end
+                elif col_type.startswith('float'):
+                    array.array(ARRAY_TYPECODES[col_type],
+                                [float('nan') if v is None else v for v in values]).tofile(files[name])
+                else:
+                    array.array(ARRAY_TYPECODES[col_type],
+                                [INT32_NULL if v is None else v for v in values]).tofile(files[name])
+    finally:
+        cur.close()
+        for handle in files.values():
+            if isinstance(handle, tuple):
+                handle[0].close()
+                handle[1].close()
+            else:
+                handle.close()
+
+    return {
+        'rows': row_count,
+        'sorted_by': spec['order_by'],
+        'columns': manifest_columns,
+    }
+
+
+def create_snapshot(conn, snapshot_dir):
+    """
+    Export Movie, Person, Director, ActsIn and Directs into snapshot_dir.
+
+    The snapshot is written to a temporary directory and renamed into place
+    once complete, so a reader never sees a half-written snapshot.
+    Returns the manifest dictionary.
+    """
+    if sys.byteorder != 'little':
+        raise RuntimeError("Snapshots are written in little-endian byte order")
+
+    tmp_dir = snapshot_dir.rstrip(os.sep) + '.tmp'
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+
+    # Export everything from a single consistent view of the database
+    conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+    cur = conn.cursor()
+    run_id, loaded_at = get_load_run(cur)
+
+    manifest = {
+        'format_version': SNAPSHOT_FORMAT_VERSION,
+        'load_run_id': run_id,
+        'loaded_at': loaded_at,
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'byte_order': 'little',
+        'tables': {},
+    }
+
+    for table, spec in SNAPSHOT_TABLES.items():
+        print(f"Exporting {table}...")
+        table_dir = os.path.join(tmp_dir, table)
+        os.makedirs(table_dir)
+        start = time.perf_counter()
+        manifest['tables'][table] = export_table(conn, table, spec, table_dir)
+        print(f"  ✓ {manifest['tables'][table]['rows']} rows "
+              f"({time.perf_counter() - start:.2f} s)")
+
+    cur.close()
+    conn.commit()
+    conn.set_session(isolation_level='DEFAULT', readonly='DEFAULT')
+
+    with open(os.path.join(tmp_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    # Swap the new snapshot into place
+    if os.path.exists(snapshot_dir):
+        shutil.rmtree(snapshot_dir)
+    os.rename(tmp_dir, snapshot_dir)
+
+    return manifest
+
+
+class StringColumn:
+    """
+    Read-only view of a string column stored as offsets + UTF-8 blob.
+    Strings are decoded on access; nothing is copied at load time.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return bytes(self.blob[start:end]).decode('utf-8')
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def load_snapshot(snapshot_dir):
+    """
+    Memory-map a snapshot written by create_snapshot.
+
+    Returns (manifest, tables) where tables maps each table name to a dict
+    of column name -> numpy.memmap (fixed-width columns) or StringColumn.
+    """
+    if np is None:
+        raise RuntimeError("Loading a snapshot needs numpy (pip install numpy)")
+
+    with open(os.path.join(snapshot_dir, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    if manifest['format_version'] != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(
+            f"Snapshot format version {manifest['format_version']} is not supported "
+            f"(expected {SNAPSHOT_FORMAT_VERSION})"
+        )
+
+    tables = {}
+    for table, info in manifest['tables'].items():
+        table_dir = os.path.join(snapshot_dir, table)
+        columns = {}
+        for name, col in info['columns'].items():
+            if col['type'] == 'str':
+                offsets = memmap_file(os.path.join(table_dir, col['offsets']), '<i8')
+                blob = memmap_file(os.path.join(table_dir, col['blob']), 'u1')
+                columns[name] = StringColumn(offsets, blob)
+            else:
+                dtype = '<i4' if col['type'] == 'int32' else '<f4'
+                columns[name] = memmap_file(os.path.join(table_dir, col['data']), dtype)
+        tables[table] = columns
+
+    return manifest, tables
+
+
+def memmap_file(path, dtype):
+    """
+    Read-only numpy.memmap of a whole file (numpy refuses to map empty files).
+    """
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r')
+
+
+def snapshot_is_current(cur, snapshot_dir):
+    """
+    True if the snapshot in snapshot_dir was taken from the load run the
+    database currently holds.
+    """
+    manifest_path = os.path.join(snapshot_dir, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return False
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    run_id, _ = get_load_run(cur)
+    return run_id is not None and manifest.get('load_run_id') == run_id
+
+
+def main():
+    """
+    Create (or refresh) the columnar snapshot of moviesdb.
+    """
+    print("PostgreSQL Database Connection")
+    db_password = getpass.getpass("Enter PostgreSQL password for user 'postgres': ")
+    snapshot_dir = input("Enter the snapshot directory [moviesdb_snapshot]: ").strip() or 'moviesdb_snapshot'
+
+    conn = None
+    try:
+        conn = psycopg2.connect(
+            host="localhost",
+            dbname="moviesdb",
+            user="postgres",
+            password=db_password,
+            cursor_factory=InstrumentedCursor
+        )
+        print("Successfully connected to moviesdb database\n")
+
+        cur = conn.cursor()
+        if snapshot_is_current(cur, snapshot_dir):
+            print(f"✓ Snapshot in {snapshot_dir} already matches the current load run")
+            return
+        cur.close()
+        conn.commit()
+
+        start = time.perf_counter()
+        manifest = create_snapshot(conn, snapshot_dir)
+        print(f"\n✓ Snapshot written to {snapshot_dir} in {time.perf_counter() - start:.2f} s")
+        print(f"  Load run ID: {manifest['load_run_id']}")
+
+    except psycopg2.Error as e:
+        print(f"\nDatabase error: {e}")
+
+    finally:
+        if conn:
+            conn.close()
+        print("\nDatabase connection closed")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,97 @@
 import psycopg2
 import csv
 import getpass
+from result_writers import check_format, export_cursor
+from telemetry import TELEMETRY, InstrumentedCursor
 
-def find_best_movies_in_years(start_year, end_year, k, output_filename):
+# Query to find the best k movies in a year range. Ties in rank are broken
+# by id so the export and the preview agree on the movies at the cut-off.
+QUERY = """
+    SELECT id, name, year, rank
+    FROM Movie
+    WHERE year >= %s AND year <= %s
+      AND rank IS NOT NULL
+      AND rank >= 0 AND rank <= 10
+    ORDER BY rank DESC, id
+    LIMIT %s
+"""
+
+# SELECT used by the streaming export. COPY cannot take bind parameters, so
+# the values are filled in with cur.mogrify before the statement is sent.
+# The rank column is rendered the way Python's csv.writer prints a float
+# (10.0 rather than Postgres' 10), and an empty name is sent as NULL because
+# COPY writes '' as "" while csv.writer writes nothing. With csv.writer using
+# '\n' line endings (like COPY), both export paths produce the same file.
+# ORDER BY names Movie.rank so it sorts on the REAL column, not the text alias.
+COPY_QUERY = """
+    SELECT id, NULLIF(name, '') AS name, year,
+           CASE WHEN rank = trunc(rank)
+                THEN trunc(rank)::integer || '.0'
+                ELSE rank::text
+           END AS rank
+    FROM Movie
+    WHERE year >= %s AND year <= %s
+      AND rank IS NOT NULL
+      AND rank >= 0 AND rank <= 10
+    ORDER BY Movie.rank DESC, Movie.id
+    LIMIT %s
+"""
+
+# Faceted versions of QUERY and COPY_QUERY. They read the precomputed
+# MovieFacets table (movie_facets.py) and {filters} adds the conditions of
+# the selected facets from FACET_FILTERS.
+FACET_QUERY = """
+    SELECT mid AS id, name, year, rank
+    FROM MovieFacets
+    WHERE year >= %s AND year <= %s
+      AND rank >= 0 AND rank <= 10{filters}
+    ORDER BY rank DESC, mid
+    LIMIT %s
+"""
+
+FACET_COPY_QUERY = """
+    SELECT mid AS id, NULLIF(name, '') AS name, year,
+           CASE WHEN rank = trunc(rank)
+                THEN trunc(rank)::integer || '.0'
+                ELSE rank::text
+           END AS rank
+    FROM MovieFacets
+    WHERE year >= %s AND year <= %s
+      AND rank >= 0 AND rank <= 10{filters}
+    ORDER BY MovieFacets.rank DESC, MovieFacets.mid
+    LIMIT %s
+"""
+
+# Facet name -> (WHERE condition, whether it takes the facet value as a
+# parameter). Directors use the GIN index on director_ids, actors the
+# index on ActsIn.pid, majority_female a partial (year, rank) index.
+FACET_FILTERS = {
+    'director_id': ("director_ids @> ARRAY[%s]", True),
+    'actor_id': ("mid IN (SELECT mid FROM ActsIn WHERE pid = %s)", True),
+    'majority_female': ("majority_female", False),
+}
+
+
+def facet_queries(facets):
+    """
+    FACET_QUERY and FACET_COPY_QUERY filtered by facets ({name: value}
+    for the facets that are set). Returns (query, copy_query,
+    facet_params); the facet parameters go between the year bounds and k.
+    """
+    filters = ""
+    params = []
+    for name, value in facets.items():
+        condition, takes_value = FACET_FILTERS[name]
+        filters += f"\n      AND {condition}"
+        if takes_value:
+            params.append(value)
+    return (FACET_QUERY.format(filters=filters),
+            FACET_COPY_QUERY.format(filters=filters), params)
+
+
+def find_best_movies_in_years(start_year, end_year, k, output_filename, stream=False,
+                              output_format='csv', director_id=None, actor_id=None,
+                              majority_female=False):
     """
     Find the best k movies in years from start_year to end_year,
     ordered by rank in descending order.
@@ -17,13 +106,47 @@ def find_best_movies_in_years(start_year, end_year, k, output_filename):
         The number of top movies to retrieve
     output_filename : str
         The name of the CSV file to save results
+    stream : bool
+        If True, stream the result straight into the CSV file with
+        COPY ... TO STDOUT instead of fetching it into Python. Memory use
+        stays flat no matter how large k is. Only applies to the csv format.
+    output_format : str
+        One of 'csv' (default), 'jsonl', 'arrow' or 'parquet'. Formats
+        other than csv are written batch by batch from a server-side cursor.
+    director_id : int, optional
+        Only movies directed by this director
+    actor_id : int, optional
+        Only movies this person acted in
+    majority_female : bool
+        Only movies where more than half of the cast is female
+    
+    The facet filters can be combined. Faceted queries read the
+    precomputed MovieFacets table instead of Movie.
         
     Returns:
     --------
     list of tuples
-        The query results as a list of tuples (id, name, year, rank)
+        The query results as a list of tuples (id, name, year, rank).
+        When stream is True or output_format is not csv, only the first
+        10 rows (the console preview) are returned, since the full result
+        is never held in memory.
     """
     
+    check_format(output_format)
+    streamed = stream or output_format != 'csv'
+    
+    facets = {}
+    if director_id is not None:
+        facets['director_id'] = director_id
+    if actor_id is not None:
+        facets['actor_id'] = actor_id
+    if majority_female:
+        facets['majority_female'] = True
+    if facets:
+        query, copy_query, facet_params = facet_queries(facets)
+    else:
+        query, copy_query, facet_params = QUERY, COPY_QUERY, []
+    
     # Prompt user for database password
     print("PostgreSQL Database Connection")
     db_password = getpass.getpass("Enter PostgreSQL password for user 'postgres': ")
@@ -36,43 +159,68 @@ def find_best_movies_in_years(start_year, end_year, k, output_filename):
             host="localhost",
             dbname="moviesdb",
             user="postgres",
-            password=db_password
+            password=db_password,
+            cursor_factory=InstrumentedCursor
         )
         cur = conn.cursor()
+        cur.query_name = 'best_movies'
         print(f"Successfully connected to moviesdb database\n")
         
         # Execute query to find best k movies in the year range
         print(f"Finding top {k} movies from {start_year} to {end_year}...")
+        if facets:
+            print("  Filtered by " + ", ".join(f"{name}={value}" for name, value in facets.items()))
         
-        query = """
-            SELECT id, name, year, rank
-            FROM Movie
-            WHERE year >= %s AND year <= %s
-              AND rank IS NOT NULL
-              AND rank >= 0 AND rank <= 10
-            ORDER BY rank DESC
-            LIMIT %s
-        """
-        
-        cur.execute(query, (start_year, end_year, k))
-        results = cur.fetchall()
-        
-        print(f"Found {len(results)} movies")
-        
-        # Save results to CSV file with semicolon delimiter
-        print(f"Saving results to {output_filename}...")
-        
-        with open(output_filename, 'w', newline='', encoding='utf-8') as csvfile:
-            csv_writer = csv.writer(csvfile, delimiter=';')
+        if output_format != 'csv':
+            # Fetch in large batches from a server-side cursor and hand
+            # each batch to the columnar/JSONL writer
+            print(f"Writing {output_format} results to {output_filename}...")
+            export_cur = conn.cursor(name='best_movies_export')
+            export_cur.query_name = 'best_movies'
+            export_cur.execute(query, (start_year, end_year, *facet_params, k))
+            row_count, results = export_cursor(export_cur, output_format,
+                                               output_filename, first_rows=10)
+            export_cur.close()
             
-            # Write header
-            csv_writer.writerow(['id', 'name', 'year', 'rank'])
+            print(f"Found {row_count} movies")
+            print(f"✓ Results saved to {output_filename}")
+        elif stream:
+            # Stream the result straight to the output file
+            print(f"Streaming results to {output_filename}...")
+            copy_sql = "COPY ({}) TO STDOUT WITH (FORMAT csv, DELIMITER ';', HEADER)".format(
+                cur.mogrify(copy_query, (start_year, end_year, *facet_params, k)).decode('utf-8')
+            )
+            with open(output_filename, 'w', newline='', encoding='utf-8') as csvfile:
+                cur.copy_expert(copy_sql, csvfile)
             
-            # Write data rows
-            for row in results:
-                csv_writer.writerow(row)
-        
-        print(f"✓ Results saved to {output_filename}")
+            if cur.rowcount >= 0:
+                print(f"Found {cur.rowcount} movies")
+            print(f"✓ Results saved to {output_filename}")
+            
+            # Fetch only the rows needed for the console preview
+            cur.execute(query, (start_year, end_year, *facet_params, min(k, 10)))
+            results = cur.fetchall()
+        else:
+            cur.execute(query, (start_year, end_year, *facet_params, k))
+            results = cur.fetchall()
+            
+            print(f"Found {len(results)} movies")
+            
+            # Save results to CSV file with semicolon delimiter
+            print(f"Saving results to {output_filename}...")
+            
+            with TELEMETRY.formatting('best_movies'), \
+                    open(output_filename, 'w', newline='', encoding='utf-8') as csvfile:
+                csv_writer = csv.writer(csvfile, delimiter=';', lineterminator='\n')
+                
+                # Write header
+                csv_writer.writerow(['id', 'name', 'year', 'rank'])
+                
+                # Write data rows
+                for row in results:
+                    csv_writer.writerow(row)
+            
+            print(f"✓ Results saved to {output_filename}")
         
         # Display first few results
         print(f"\nTop 10 results:")
@@ -81,7 +229,7 @@ def find_best_movies_in_years(start_year, end_year, k, output_filename):
         for i, row in enumerate(results[:10]):
             print(f"{row[0]:<10} {row[1][:48]:<50} {row[2]:<10} {row[3]:<10.2f}")
         
-        if len(results) > 10:
+        if not streamed and len(results) > 10:
             print(f"... and {len(results) - 10} more rows")
         
     except psycopg2.Error as e:
@@ -0,0 +1,330 @@
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+
+# Configuration (environment variables):
+#   MOVIESDB_TELEMETRY       file to export to at exit (.json or .prom)
+#   MOVIESDB_SLOW_QUERY_MS   slow-query threshold in milliseconds
+#   MOVIESDB_SLOW_QUERY_LOG  file that slow queries are appended to (JSON lines)
+EXPORT_PATH = os.environ.get('MOVIESDB_TELEMETRY')
+SLOW_QUERY_MS = float(os.environ.get('MOVIESDB_SLOW_QUERY_MS', '500'))
+SLOW_QUERY_LOG = os.environ.get('MOVIESDB_SLOW_QUERY_LOG')
+
+# Upper bounds (milliseconds) of the latency histogram buckets
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+
+# Statements that are EXPLAINed in the slow-query log (plain EXPLAIN does
+# not execute them)
+EXPLAINABLE = re.compile(r'^\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b', re.IGNORECASE)
+
+# Start of a VALUES list in a statement's text
+INLINE_VALUES = re.compile(r'\bVALUES\b', re.IGNORECASE)
+
+# Slow queries kept in memory for the JSON export (the log file gets all)
+MAX_SLOW_QUERIES = 100
+
+# Parameter rows of an executemany kept in a slow-query entry
+SLOW_QUERY_PARAM_ROWS = 3
+
+
+def default_query_name(query):
+    """
+    Name for a statement that was not given one: its first 60 characters
+    with whitespace collapsed, cut after VALUES so that statements with
+    inlined rows (execute_values) share one name.
+    """
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    elif not isinstance(query, str):
+        query = str(query)
+    name = ' '.join(query.split())
+    values = INLINE_VALUES.search(name)
+    if values:
+        name = name[:values.end()] + ' ...'
+    return name[:60]
+
+
+def summarize_params(params):
+    """
+    Short text for a slow statement's parameters. executemany's list of
+    rows is given as its length and first few rows, without formatting
+    the whole batch.
+    """
+    if params is None:
+        return None
+    if isinstance(params, list):
+        head = ', '.join(repr(row) for row in params[:SLOW_QUERY_PARAM_ROWS])
+        more = ', ...' if len(params) > SLOW_QUERY_PARAM_ROWS else ''
+        return f"{len(params)} rows: [{head}{more}]"[:1000]
+    return repr(params)[:1000]
+
+
+def estimate_bytes(rows):
+    """
+    Rough size of fetched rows: string lengths plus 8 bytes per other value.
+    """
+    total = 0
+    for row in rows:
+        for value in row:
+            total += len(value) if isinstance(value, (str, bytes)) else 8
+    return total
+
+
+class QueryStats:
+    """Counters for one query name."""
+
+    def __init__(self):
+        self.executions = 0
+        self.errors = 0
+        self.execute_seconds = 0.0
+        self.fetch_seconds = 0.0
+        self.format_seconds = 0.0
+        self.rows = 0
+        self.bytes = 0
+        # Per-bucket counts; the Prometheus export makes them cumulative
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def observe_latency(self, ms):
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def to_dict(self):
+        return {
+            'executions': self.executions,
+            'errors': self.errors,
+            'execute_seconds': round(self.execute_seconds, 6),
+            'fetch_seconds': round(self.fetch_seconds, 6),
+            'format_seconds': round(self.format_seconds, 6),
+            'rows': self.rows,
+            'bytes': self.bytes,
+            'latency_histogram_ms': dict(zip(
+                [str(b) for b in LATENCY_BUCKETS_MS] + ['+Inf'], self.buckets
+            )),
+        }
+
+
+class Telemetry:
+    """
+    Per-query-name latency histograms, row/byte counts, Python formatting
+    time and a slow-query log. Safe to use from several threads.
+    """
+
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS, slow_query_log=SLOW_QUERY_LOG):
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.slow_queries = deque(maxlen=MAX_SLOW_QUERIES)
+        self.slow_count = 0
+        self.slow_query_ms = slow_query_ms
+        self.slow_query_log = slow_query_log
+
+    def _stats(self, name):
+        if name not in self.stats:
+            self.stats[name] = QueryStats()
+        return self.stats[name]
+
+    def record_execute(self, name, seconds, failed=False):
+        with self.lock:
+            stats = self._stats(name)
+            stats.executions += 1
+            stats.errors += int(failed)
+            stats.execute_seconds += seconds
+            stats.observe_latency(seconds * 1000)
+
+    def record_fetch(self, name, seconds, rows):
+        n_bytes = estimate_bytes(rows)
+        with self.lock:
+            stats = self._stats(name)
+            stats.fetch_seconds += seconds
+            stats.rows += len(rows)
+            stats.bytes += n_bytes
+
+    def record_slow(self, name, query, params, seconds, plan):
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'name': name,
+            'ms': round(seconds * 1000, 3),
+            'query': query if isinstance(query, str) else default_query_name(query),
+            'params': summarize_params(params),
+            'plan': plan,
+        }
+        with self.lock:
+            self.slow_queries.append(entry)
+            self.slow_count += 1
+            if self.slow_query_log:
+                with open(self.slow_query_log, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry) + '\n')
+
+    @contextmanager
+    def formatting(self, name):
+        """
+        Time the Python-side formatting/writing of a query's results:
+            with TELEMETRY.formatting('a'):
+                write_text_section(...)
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self._stats(name).format_seconds += elapsed
+
+    def to_json(self):
+        with self.lock:
+            return json.dumps({
+                'queries': {name: s.to_dict() for name, s in self.stats.items()},
+                'slow_query_ms': self.slow_query_ms,
+                'slow_query_count': self.slow_count,
+                'slow_queries': list(self.slow_queries),
+            }, indent=2)
+
+    def to_prometheus(self):
+        """
+        Prometheus text exposition format.
+        """
+        def label(name):
+            return name.replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+        lines = [
+            "# HELP moviesdb_query_latency_ms Statement execution latency.",
+            "# TYPE moviesdb_query_latency_ms histogram",
+        ]
+        with self.lock:
+            stats = list(self.stats.items())
+            slow_count = self.slow_count
+        for name, s in stats:
+            cumulative = 0
+            for bound, count in zip([str(b) for b in LATENCY_BUCKETS_MS] + ['+Inf'], s.buckets):
+                cumulative += count
+                lines.append(f'moviesdb_query_latency_ms_bucket{{query="{label(name)}",le="{bound}"}} {cumulative}')
+            lines.append(f'moviesdb_query_latency_ms_sum{{query="{label(name)}"}} {s.execute_seconds * 1000:.3f}')
+            lines.append(f'moviesdb_query_latency_ms_count{{query="{label(name)}"}} {s.executions}')
+
+        counters = [
+            ('moviesdb_query_errors_total', 'Statements that raised an error.', 'errors'),
+            ('moviesdb_query_rows_total', 'Rows fetched.', 'rows'),
+            ('moviesdb_query_bytes_total', 'Approximate bytes fetched.', 'bytes'),
+            ('moviesdb_query_fetch_seconds_total', 'Time spent fetching rows.', 'fetch_seconds'),
+            ('moviesdb_query_format_seconds_total', 'Time spent formatting results in Python.', 'format_seconds'),
+        ]
+        for metric, help_text, attr in counters:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for name, s in stats:
+                lines.append(f'{metric}{{query="{label(name)}"}} {getattr(s, attr)}')
+
+        lines.append("# HELP moviesdb_slow_queries_total Statements slower than the slow-query threshold.")
+        lines.append("# TYPE moviesdb_slow_queries_total counter")
+        lines.append(f"moviesdb_slow_queries_total {slow_count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """
+        Write the telemetry to path: Prometheus text for .prom, JSON otherwise.
+        """
+        content = self.to_prometheus() if path.endswith('.prom') else self.to_json()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+
+# Process-wide telemetry shared by every InstrumentedCursor
+TELEMETRY = Telemetry()
+
+if EXPORT_PATH:
+    atexit.register(lambda: TELEMETRY.export(EXPORT_PATH))
+
+
+class InstrumentedCursor(psycopg2.extensions.cursor):
+    """
+    Cursor that records every execute/fetch in TELEMETRY. Use it with
+    psycopg2.connect(..., cursor_factory=InstrumentedCursor) and set
+    cur.query_name before executing to group statements under a name.
+    """
+
+    query_name = None
+
+    def _timed_execute(self, method, query, vars):
+        name = self.query_name or default_query_name(query)
+        self._telemetry_name = name
+        start = time.perf_counter()
+        try:
+            result = method(query, vars)
+        except psycopg2.Error:
+            TELEMETRY.record_execute(name, time.perf_counter() - start, failed=True)
+            raise
+        elapsed = time.perf_counter() - start
+        TELEMETRY.record_execute(name, elapsed)
+        if elapsed * 1000 >= TELEMETRY.slow_query_ms:
+            TELEMETRY.record_slow(name, query, vars, elapsed, self._explain(query, vars))
+        return result
+
+    def execute(self, query, vars=None):
+        return self._timed_execute(super().execute, query, vars)
+
+    def executemany(self, query, vars_list):
+        return self._timed_execute(super().executemany, query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        return self._timed_execute(lambda q, _: super(InstrumentedCursor, self).copy_expert(q, file, size), sql, None)
+
+    def _explain(self, query, vars):
+        """
+        EXPLAIN (without ANALYZE) a slow statement on a separate cursor.
+        Returns the plan text, or None if it cannot be explained.
+        """
+        if not isinstance(query, str) or not EXPLAINABLE.match(query):
+            return None
+        if isinstance(vars, list):
+            return None  # executemany: no single parameter set to explain
+        conn = self.connection
+        if conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_INERROR:
+            return None
+        explain_cur = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+        use_savepoint = not conn.autocommit
+        try:
+            if use_savepoint:
+                explain_cur.execute("SAVEPOINT telemetry_explain")
+            explain_cur.execute("EXPLAIN " + query, vars)
+            plan = "\n".join(row[0] for row in explain_cur.fetchall())
+            if use_savepoint:
+                explain_cur.execute("RELEASE SAVEPOINT telemetry_explain")
+            return plan
+        except psycopg2.Error:
+            if use_savepoint:
+                explain_cur.execute("ROLLBACK TO SAVEPOINT telemetry_explain")
+            return None
+        finally:
+            explain_cur.close()
+
+    def _timed_fetch(self, method, *args):
+        start = time.perf_counter()
+        rows = method(*args)
+        elapsed = time.perf_counter() - start
+        name = getattr(self, '_telemetry_name', None) or 'unnamed'
+        TELEMETRY.record_fetch(name, elapsed, rows)
+        return rows
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        elapsed = time.perf_counter() - start
+        name = getattr(self, '_telemetry_name', None) or 'unnamed'
+        TELEMETRY.record_fetch(name, elapsed, [row] if row is not None else [])
+        return row
+
+    def fetchmany(self, size=None):
+        return self._timed_fetch(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._timed_fetch(super().fetchall)